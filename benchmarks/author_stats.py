@@ -0,0 +1,52 @@
+"""Compare the per-award groupbys with the shared per-author table.
+
+python benchmarks/author_stats.py -n 200000
+"""
+
+import argparse
+import time
+
+import pandas as pd
+
+from reddit_bestof import utils
+from synthetic import get_frames
+
+
+def per_award(df_comments: pd.DataFrame):
+    """Previous implementation: one full groupby().sum() per award."""
+    df_comments = df_comments.copy()
+    df_comments["capslock"] = utils.count_capslock(df_comments["body"])
+    df_comments["question"] = utils.count_questions(df_comments["body"])
+    for _ in range(6):
+        df_comments.groupby(["author"]).sum()
+
+
+def shared_table(df_comments: pd.DataFrame):
+    author_stats = utils.get_author_stats(df_comments)
+    for award in [
+        utils.get_qualite,
+        utils.get_poc,
+        utils.get_tartine,
+        utils.get_capslock,
+        utils.get_indecision,
+        utils.get_jackpot,
+        utils.get_krach,
+    ]:
+        award(df_comments, author_stats)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", help="Number of comments", type=int, default=100000)
+    parser.add_argument("-a", help="Number of authors", type=int, default=5000)
+    args = parser.parse_args()
+
+    _, df_comments = get_frames(args.n, authors=args.a)
+    for function in [per_award, shared_table]:
+        start = time.perf_counter()
+        function(df_comments)
+        print(f"{function.__name__}: {time.perf_counter() - start:.2f} seconds")
+
+
+if __name__ == "__main__":
+    main()
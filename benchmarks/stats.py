@@ -0,0 +1,110 @@
+"""Time and peak memory of each stat of a report, on synthetic data.
+
+PYTHONPATH=. python benchmarks/stats.py -n 10000 100000 1000000 -o results.json
+PYTHONPATH=. python benchmarks/stats.py -n 100000 --baseline results.json
+
+Peak memory is measured by tracemalloc in a second run of each function,
+it counts the allocations of Python objects and numpy arrays.
+"""
+
+import argparse
+import json
+import time
+import tracemalloc
+
+import pandas as pd
+
+from reddit_bestof import stats
+from reddit_bestof.__main__ import get_env_post
+from synthetic import get_frames
+
+# Slower than the baseline by this ratio is reported as a regression
+REGRESSION_RATIO = 1.2
+
+
+def get_benchmarks(df_posts: pd.DataFrame, df_comments: pd.DataFrame) -> dict:
+    """Each stat and derived input of the registry, then the whole report."""
+    values = {"reddit": None, "df_posts": df_posts, "df_comments": df_comments}
+    for name, task in stats.INPUTS.items():
+        values[name] = task.function(*[values[x] for x in task.inputs])
+    benchmarks = {
+        task.name: lambda task=task: task.function(*[values[x] for x in task.inputs])
+        for task in [*stats.INPUTS.values(), *stats.STATS]
+    }
+    benchmarks["get_env_post"] = lambda: get_env_post(
+        None, df_posts, df_comments, "date", "france"
+    )
+    return benchmarks
+
+
+def measure(function) -> dict:
+    start = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - start
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": seconds, "peak_mb": peak / 2**20}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-n",
+        help="Numbers of comments (default: 10000 100000)",
+        type=int,
+        nargs="+",
+        default=[10000, 100000],
+    )
+    parser.add_argument("-o", "--output", help="Save the results in this JSON file")
+    parser.add_argument(
+        "--baseline", help="Compare with the results saved by a previous run"
+    )
+    parser.add_argument(
+        "--only", help="Only run the benchmarks with these names", nargs="+"
+    )
+    args = parser.parse_args()
+
+    # main() sets it so that get_discussed_comment doesn't truncate links
+    pd.options.display.max_colwidth = None
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    results = {}
+    regressions = []
+    for n in args.n:
+        start = time.perf_counter()
+        df_posts, df_comments = get_frames(n)
+        print(
+            f"{n} comments, {len(df_posts)} posts "
+            f"(generated in {time.perf_counter() - start:.1f} seconds)"
+        )
+        results[str(n)] = {}
+        for name, function in get_benchmarks(df_posts, df_comments).items():
+            if args.only and name not in args.only:
+                continue
+            result = measure(function)
+            results[str(n)][name] = result
+            line = (
+                f"  {name:<24}{result['seconds']:>9.3f} s{result['peak_mb']:>10.1f} MB"
+            )
+            previous = baseline.get(str(n), {}).get(name)
+            if previous:
+                ratio = result["seconds"] / max(previous["seconds"], 1e-6)
+                line += f"{ratio:>8.2f}x"
+                if ratio > REGRESSION_RATIO:
+                    line += " slower"
+                    regressions.append(f"{name} ({n} comments)")
+            print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        print(f"Regressions: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
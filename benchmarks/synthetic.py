@@ -0,0 +1,116 @@
+"""Synthetic posts and comments frames, shaped like the ones built by get_data.
+
+Authors and the number of comments per post follow Zipf laws, comments
+answer the post or an earlier comment of the same post, bodies are French
+sentences with some words in capitals and some questions.
+"""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+WORDS = np.array(
+    (
+        "le la les un une des et mais donc or ni car je tu il elle on nous vous "
+        "ils pas plus très bien trop rien tout tous encore déjà toujours jamais "
+        "France Paris gouvernement président impôts grève retraite baguette "
+        "fromage vin pain métro vacances travail salaire loyer voiture vélo "
+        "est sont fait faire dit pense crois sais veux peut faut vraiment "
+        "franchement carrément normal bizarre génial nul incroyable énorme "
+        "aujourd'hui demain hier matin soir semaine année ça ce cette"
+    ).split()
+)
+CAPS_WORDS = np.array(["NON", "OUI", "JAMAIS", "MDR", "PTDR", "STOP", "VRAIMENT"])
+ENDINGS = np.array([".", ".", ".", "!", "?", " ?", "...", ""])
+# Chunk size used to build the bodies, to bound the memory of the word indexes
+CHUNK_SIZE = 100000
+
+
+def get_zipf_choice(
+    rng: np.random.Generator, values: int, size: int, exponent: float = 1.1
+) -> np.ndarray:
+    """Draw size integers in [0, values) with P(k) proportional to 1 / (k + 1) ** exponent."""
+    weights = 1 / np.arange(1, values + 1) ** exponent
+    return rng.choice(values, size=size, p=weights / weights.sum())
+
+
+def get_bodies(rng: np.random.Generator, n: int) -> list:
+    bodies = []
+    for start in range(0, n, CHUNK_SIZE):
+        size = min(CHUNK_SIZE, n - start)
+        lengths = np.minimum(rng.geometric(1 / 14, size), 60)
+        words = rng.choice(WORDS, size=(size, 60))
+        caps = rng.random((size, 60)) < 0.03
+        words[caps] = rng.choice(CAPS_WORDS, size=caps.sum())
+        endings = rng.choice(ENDINGS, size=size)
+        bodies.extend(
+            " ".join(row[:length]) + ending
+            for row, length, ending in zip(words.tolist(), lengths, endings)
+        )
+    return bodies
+
+
+def get_frames(
+    comments: int, posts: int = None, authors: int = None, seed: int = 0
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Return df_posts and df_comments with comments rows.
+
+    By default there is one post per 40 comments and one author per 20
+    comments.
+    """
+    rng = np.random.default_rng(seed)
+    posts = posts or max(comments // 40, 1)
+    authors = authors or max(comments // 20, 2)
+    author_names = np.array([f"/u/user{i}" for i in range(authors)], dtype=object)
+
+    # Comments are grouped by post, in the order of their creation
+    post_of_comment = np.sort(get_zipf_choice(rng, posts, comments, 0.9))
+    num_comments = np.bincount(post_of_comment, minlength=posts)
+    first_comment = np.concatenate([[0], np.cumsum(num_comments)[:-1]])
+    position = np.arange(comments) - first_comment[post_of_comment]
+
+    post_ids = np.array([f"p{i}" for i in range(posts)], dtype=object)
+    comment_ids = np.array([f"c{i}" for i in range(comments)], dtype=object)
+    # A third of the comments answer the post, the others an earlier comment
+    answers_post = (position == 0) | (rng.random(comments) < 0.35)
+    parent = first_comment[post_of_comment] + (rng.random(comments) * position).astype(
+        np.int64
+    )
+    parents = np.where(
+        answers_post,
+        "t3_" + post_ids[post_of_comment],
+        "t1_" + comment_ids[np.minimum(parent, comments - 1)],
+    )
+
+    post_timestamps = 1635807600 + np.sort(rng.integers(0, 86400, posts))
+    bodies = get_bodies(rng, comments)
+    df_comments = pd.DataFrame(
+        {
+            "id": comment_ids,
+            "score": np.round(rng.pareto(1.2, comments) * 3).astype(np.int64)
+            - rng.integers(0, 5, comments),
+            "author": author_names[get_zipf_choice(rng, authors, comments)],
+            "permalink": "https://reddit.com/r/france/comments/"
+            + post_ids[post_of_comment]
+            + "/_/"
+            + comment_ids
+            + "/?context=2",
+            "body": bodies,
+            "parent": parents,
+            "length": np.array([len(x) for x in bodies]),
+            "timestamp": post_timestamps[post_of_comment],
+        }
+    )
+    df_posts = pd.DataFrame(
+        {
+            "id": post_ids,
+            "score": np.round(rng.pareto(1.0, posts) * 10).astype(np.int64),
+            "author": author_names[get_zipf_choice(rng, authors, posts)],
+            "permalink": "https://reddit.com/r/france/comments/" + post_ids + "/_/",
+            "title": get_bodies(rng, posts),
+            "timestamp": post_timestamps,
+            "num_comments": num_comments,
+        }
+    )
+    return df_posts, df_comments
@@ -5,79 +5,140 @@ import json
 import locale
 import logging
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
 from string import Template
-from typing import Tuple
+from typing import Optional, Union
 
 import pandas as pd
 import praw
 import requests
-from tqdm import tqdm
 
-from . import date_utils, utils
+from . import archive, collector, date_utils, frames, rollup, snapshot, stats, utils
+from .expand import ExpansionBudget
+from .extract import (
+    COMMENT_ENGINES,
+    add_submission_data,
+    get_listing_data,
+    get_reddit_submissions,
+    refresh_frame_scores,
+)
+from .graph import ReplyGraph, get_reply_graph
+from .metrics import Metrics, save_metrics
+from .requestor import BestofRequestor, Cassette, RateLimiter, RequestStats
+from .store import Store
+from .streaming import StreamingStats
 
 logger = logging.getLogger()
 logging.getLogger("praw").setLevel(logging.WARNING)
 START_TIME = time.time()
-MAX_POSTS_TO_EXTRACT = 3000
+STATS_ENGINES = ["frames", "streaming"]
+# Arguments that can be set per job in --jobs
+JOB_KEYS = [
+    "subreddit",
+    "post_subreddit",
+    "template_file",
+    "template_file_title",
+    "template_file_message",
+]
+# Days of a backfill read from --archive and submitted together
+BACKFILL_CHUNK_DAYS = 7
+
+
+def get_reddit(
+    rate_limiter: RateLimiter, stats: RequestStats, cassette: Cassette = None
+) -> praw.Reddit:
+    """Create a Reddit session whose requests all go through rate_limiter.
+
+    When replaying a cassette, no credentials are needed.
+    """
+    kwargs = {
+        "user_agent": "python:script:reddit_bestof",
+        "requestor_class": BestofRequestor,
+        "requestor_kwargs": {
+            "rate_limiter": rate_limiter,
+            "stats": stats,
+            "cassette": cassette,
+        },
+    }
+    if cassette and not cassette.record:
+        return praw.Reddit(
+            client_id="replay",
+            client_secret="replay",
+            check_for_updates=False,
+            **kwargs,
+        )
+    if Path.cwd() / "praw.ini":
+        return praw.Reddit("bot", **kwargs)
+    return praw.Reddit(**kwargs)
 
 
-def get_reddit_ids(
-    reddit: praw.Reddit, sub: str, min_timestamp: int, max_timestamp: int, test: bool
-) -> list:
-    limit = 100 if test else MAX_POSTS_TO_EXTRACT
-    posts = reddit.subreddit(sub).new(limit=limit)
-    list_posts = [{"id": i.id, "timestamp": int(i.created_utc)} for i in posts]
-    logger.debug(f"Posts extracted with praw API {len(list_posts)}")
-    post_ids = [
-        i["id"]
-        for i in list_posts
-        if i["timestamp"] >= min_timestamp and i["timestamp"] <= max_timestamp
-    ]
-    return post_ids
-
-
-def get_data(reddit, post_ids: list) -> Tuple[list, list]:
-    posts = []
-    comments = []
-    for i in tqdm(post_ids, dynamic_ncols=True):
-        submission = reddit.submission(i)
-        author = str(submission.author)
-        if (
-            author.lower() not in ["none"]
-            and not submission.hidden
-            and submission.is_robot_indexable
-        ):
-            posts.append(
-                {
-                    "id": i,
-                    "score": submission.score,
-                    "author": utils.sanitize_username("/u/" + author),
-                    "permalink": f"https://reddit.com{submission.permalink}",
-                    "title": submission.title,
-                    "timestamp": int(submission.created_utc),
-                    "num_comments": submission.num_comments,
-                }
+def extract_from_api(
+    reddit: praw.Reddit,
+    metrics: Metrics,
+    args: argparse.Namespace,
+    report_date: str,
+    min_timestamp: int,
+    max_timestamp: int,
+    builder: Union[frames.FramesBuilder, StreamingStats],
+):
+    """Add the posts and comments of the window to builder with the selected engine."""
+    with metrics.stage("listing"):
+        submissions = get_reddit_submissions(
+            reddit, args.subreddit, min_timestamp, max_timestamp, args.test
+        )
+
+    if len(submissions) == 0:
+        raise ValueError(
+            f"No posts were found on /r/{args.subreddit} for {report_date} (between {min_timestamp} and {max_timestamp})."
+        )
+
+    requests_before = metrics.stats.requests
+    if args.comment_engine == "listing":
+        with metrics.stage("comment_listing"):
+            posts, comments = get_listing_data(
+                reddit, args.subreddit, submissions, min_timestamp, max_timestamp
             )
-            submission.comments.replace_more(limit=None)
-            for comment in submission.comments.list():
-                author = str(comment.author)
-                if author.lower() not in ["none", "automoderator"]:
-                    body = utils.sanitize_comment_body(comment.body)
-                    comments.append(
-                        {
-                            "id": comment.id,
-                            "score": comment.score,
-                            "author": utils.sanitize_username("/u/" + author),
-                            "permalink": utils.sanitize_link(comment.permalink),
-                            "body": body,
-                            "parent": comment.parent_id,
-                            "length": len(body),
-                            "timestamp": int(submission.created_utc),
-                        }
-                    )
-    return posts, comments
+        with metrics.stage("dataframes"):
+            add_rows(builder, posts, comments)
+    else:
+        store = Store(args.store) if args.store else None
+        budget = ExpansionBudget(
+            args.more_comments_budget, args.more_comments_per_post, args.workers
+        )
+        try:
+            with metrics.stage("submissions"):
+                add_submission_data(
+                    builder, reddit, submissions, args.workers, store, budget
+                )
+        finally:
+            if store:
+                store.close()
+        logger.info(budget.summary())
+        metrics.add(
+            "expand_comments", seconds=budget.seconds, requests=len(budget.recovered)
+        )
+    logger.info(
+        f"Extraction with the {args.comment_engine} engine: {metrics.stats.requests - requests_before} requests."
+    )
+
+
+def get_builder(
+    args: argparse.Namespace,
+) -> Union[frames.FramesBuilder, StreamingStats]:
+    """Where the extracted rows go, depending on --stats_engine."""
+    if args.stats_engine == "streaming":
+        return StreamingStats()
+    return frames.FramesBuilder(not args.lazy_bodies)
+
+
+def add_rows(
+    builder: Union[frames.FramesBuilder, StreamingStats], posts: list, comments: list
+):
+    for post in posts:
+        builder.add_post(post)
+    builder.add_comments(comments)
 
 
 def get_env_post(
@@ -86,92 +147,247 @@ def get_env_post(
     df_comments: pd.DataFrame,
     formatted_date: str,
     subreddit: str,
+    author_stats: pd.DataFrame = None,
+    metrics: Metrics = None,
+    keys: Optional[set] = None,
+    workers: int = 1,
+    reply_graph: ReplyGraph = None,
 ) -> dict:
-    """Create stats from posts and comments."""
+    """Create stats from posts and comments, each one measured in metrics.
+
+    Only the stats setting one of keys are computed, all of them if None.
+    With workers > 1, independent stats are computed by a thread pool.
+    """
     number_total_posts = len(df_posts)
     number_total_comments = len(df_comments)
     number_unique_users = len(
-        pd.unique(df_posts["author"]._append(df_comments["author"], ignore_index=True))
-    )
-    best_post = utils.get_best_post(df_posts)
-    commented_post = utils.get_commented_post(df_posts)
-    best_comment = utils.get_best_comment(df_comments)
-    worst_comment = utils.get_worst_comment(df_comments)
-    discussed_comment = utils.get_discussed_comment(reddit, df_comments)
-    amoureux_stat = utils.get_amoureux(df_comments)
-    qualite_stat = utils.get_qualite(df_comments)
-    poc_stat = utils.get_poc(df_comments)
-    tartine_stat = utils.get_tartine(df_comments)
-    capslock_stat = utils.get_capslock(df_comments)
-    indecision_stat = utils.get_indecision(df_comments)
-    jackpot_stat = utils.get_jackpot(df_comments)
-    krach_stat = utils.get_krach(df_comments)
-
+        pd.unique(
+            pd.concat([df_posts["author"], df_comments["author"]], ignore_index=True)
+        )
+    )
     return {
         "date": formatted_date,
         "subreddit": subreddit,
         "number_total_posts": number_total_posts,
         "number_total_comments": number_total_comments,
         "number_unique_users": number_unique_users,
-        "best_post_author": best_post["best_post_author"],
-        "best_post_score": best_post["best_post_score"],
-        "best_post_title": best_post["best_post_title"],
-        "best_post_link": best_post["best_post_link"],
-        "best_post_id": best_post["best_post_id"],
-        "commented_post_author": commented_post["commented_post_author"],
-        "commented_post_comments": commented_post["commented_post_comments"],
-        "commented_post_title": commented_post["commented_post_title"],
-        "commented_post_link": commented_post["commented_post_link"],
-        "commented_post_id": commented_post["commented_post_id"],
-        "best_comment_author": best_comment["best_comment_author"],
-        "best_comment_score": best_comment["best_comment_score"],
-        "best_comment_body": best_comment["best_comment_body"],
-        "best_comment_link": best_comment["best_comment_link"],
-        "best_comment_id": best_comment["best_comment_id"],
-        "worst_comment_author": worst_comment["worst_comment_author"],
-        "worst_comment_score": worst_comment["worst_comment_score"],
-        "worst_comment_body": worst_comment["worst_comment_body"],
-        "worst_comment_link": worst_comment["worst_comment_link"],
-        "worst_comment_id": worst_comment["worst_comment_id"],
-        "discussed_comment_author": discussed_comment["discussed_comment_author"],
-        "discussed_comment_answers": discussed_comment["discussed_comment_answers"],
-        "discussed_comment_body": discussed_comment["discussed_comment_body"],
-        "discussed_comment_link": discussed_comment["discussed_comment_link"],
-        "discussed_comment_id": discussed_comment["discussed_comment_id"],
-        "amoureux_author1": amoureux_stat["amoureux_author1"],
-        "amoureux_author2": amoureux_stat["amoureux_author2"],
-        "amoureux_score": amoureux_stat["amoureux_score"],
-        "qualite_author": qualite_stat["qualite_author"],
-        "qualite_score": qualite_stat["qualite_score"],
-        "poc_author": poc_stat["poc_author"],
-        "poc_score": poc_stat["poc_score"],
-        "tartine_author": tartine_stat["tartine_author"],
-        "tartine_score": tartine_stat["tartine_score"],
-        "capslock_author": capslock_stat["capslock_author"],
-        "capslock_score": capslock_stat["capslock_score"],
-        "indecision_author": indecision_stat["indecision_author"],
-        "indecision_score": indecision_stat["indecision_score"],
-        "jackpot_author": jackpot_stat["jackpot_author"],
-        "jackpot_score": jackpot_stat["jackpot_score"],
-        "krach_author": krach_stat["krach_author"],
-        "krach_score": krach_stat["krach_score"],
+        **stats.compute_stats(
+            stats.STATS,
+            stats.INPUTS,
+            {
+                "reddit": reddit,
+                "df_posts": df_posts,
+                "df_comments": df_comments,
+                **({} if author_stats is None else {"author_stats": author_stats}),
+                **({} if reply_graph is None else {"reply_graph": reply_graph}),
+            },
+            keys,
+            metrics,
+            workers,
+        ),
     }
 
 
+def get_env_day(
+    reddit: praw.Reddit,
+    metrics: Metrics,
+    args: argparse.Namespace,
+    report_date: str,
+    formatted_date: str,
+    min_timestamp: int,
+    max_timestamp: int,
+    keys: Optional[set] = None,
+    archive_data: Optional[list] = None,
+) -> dict:
+    """Extract the data of the day, create its stats and save its rollup.
+
+    Only the stats setting one of keys are computed, all of them if None.
+    archive_data are the posts of the day with their comments when the
+    --archive dumps were already read, by a backfill.
+    """
+    builder = get_builder(args)
+    if args.collect or args.from_store:
+        with Store(args.store) as store:
+            if args.collect:
+                with metrics.stage("collect"):
+                    collector.collect(
+                        reddit,
+                        store,
+                        args.subreddit,
+                        min_timestamp,
+                        max_timestamp,
+                        args.poll_interval,
+                    )
+            with metrics.stage("load_store"):
+                posts, comments = store.load_data(
+                    args.subreddit, min_timestamp, max_timestamp
+                )
+        if len(posts) == 0:
+            raise ValueError(
+                f"No posts were found in {args.store} for /r/{args.subreddit} and {report_date}."
+            )
+        with metrics.stage("dataframes"):
+            add_rows(builder, posts, comments)
+        del posts, comments
+    elif args.archive:
+        posts = 0
+        if archive_data is None:
+            archive_data = archive.iter_archive_data(
+                args.archive, args.subreddit, min_timestamp, max_timestamp, args.workers
+            )
+        with metrics.stage("archive"):
+            for post, comments in archive_data:
+                builder.add_post(post)
+                builder.add_comments(comments)
+                posts += 1
+        if posts == 0:
+            raise ValueError(
+                f"No posts were found in the archives for /r/{args.subreddit} and {report_date}."
+            )
+    else:
+        extract_from_api(
+            reddit, metrics, args, report_date, min_timestamp, max_timestamp, builder
+        )
+
+    if args.stats_engine == "streaming":
+        with metrics.stage("rollup"):
+            day_rollup = builder.get_rollup()
+            if not args.no_rollup:
+                rollup.save_rollup(day_rollup, args.subreddit, report_date)
+        return metrics.call(
+            rollup.get_env_rollup,
+            reddit,
+            day_rollup,
+            formatted_date,
+            args.subreddit,
+            keys,
+        )
+    with metrics.stage("dataframes"):
+        df_posts, df_comments = builder.get_frames()
+
+    if args.refresh_scores:
+        df_posts, df_comments = metrics.call(
+            refresh_frame_scores, reddit, df_posts, df_comments
+        )
+        if args.store:
+            with Store(args.store) as store:
+                store.update_scores(
+                    zip(
+                        df_posts["id"].tolist(),
+                        df_posts["score"].tolist(),
+                        df_posts["num_comments"].tolist(),
+                    ),
+                    zip(df_comments["id"].tolist(), df_comments["score"].tolist()),
+                )
+
+    # Stats calculation, the rollup needs all the author stats and the reply graph
+    reply_graph = None
+    # Only refreshed scores can make a comment with a dropped body a winner
+    fetch_bodies = args.lazy_bodies and args.refresh_scores
+    if not args.no_rollup or fetch_bodies:
+        # The bodies fetched again don't change the graph of the window
+        reply_graph = metrics.call(get_reply_graph, df_comments)
+    if fetch_bodies:
+        df_comments = metrics.call(
+            frames.fetch_missing_bodies,
+            reddit,
+            df_comments,
+            reply_graph=reply_graph,
+        )
+    author_stats = None
+    if not args.no_rollup:
+        author_stats = metrics.call(utils.get_author_stats, df_comments)
+    env_post = get_env_post(
+        reddit,
+        df_posts,
+        df_comments,
+        formatted_date,
+        args.subreddit,
+        author_stats,
+        metrics,
+        keys,
+        args.stats_workers,
+        reply_graph,
+    )
+    if not args.no_rollup:
+        with metrics.stage("rollup"):
+            rollup.save_rollup(
+                rollup.get_rollup(
+                    df_posts, df_comments, author_stats, reply_graph=reply_graph
+                ),
+                args.subreddit,
+                report_date,
+            )
+    if args.snapshot:
+        metrics.call(
+            snapshot.save_snapshot, df_posts, df_comments, args.subreddit, report_date
+        )
+    return env_post
+
+
+def get_env_period(
+    reddit: praw.Reddit,
+    args: argparse.Namespace,
+    report_date: str,
+    keys: Optional[set] = None,
+) -> dict:
+    """Create the stats of a week, month or year by merging daily rollups."""
+    formatted_date, days = date_utils.get_period_range(report_date, args.period)
+    rollups = []
+    for day in days:
+        day_rollup = rollup.load_rollup(args.subreddit, day)
+        if day_rollup is None:
+            logger.warning(f"No rollup for /r/{args.subreddit} and {day}.")
+        else:
+            rollups.append(day_rollup)
+    if len(rollups) == 0:
+        raise ValueError(
+            f"No rollups were found for /r/{args.subreddit} between {days[0]} and {days[-1]}."
+        )
+    logger.info(f"Merging the rollups of {len(rollups)} days.")
+    return rollup.get_env_rollup(
+        reddit, rollup.merge_rollups(rollups), formatted_date, args.subreddit, keys
+    )
+
+
 def read_template(file: str) -> Template:
     with open(file) as f:
         content = f.read()
     return Template(content)
 
 
+def get_template_keys(file: str) -> set:
+    """Identifiers of the placeholders of a template."""
+    template = read_template(file)
+    return {
+        match.group("named") or match.group("braced")
+        for match in template.pattern.finditer(template.template)
+        if match.group("named") or match.group("braced")
+    }
+
+
+def get_report_keys(args: argparse.Namespace) -> set:
+    """Keys of env_post used to send the report.
+
+    The placeholders of the post template, the best comment for the title
+    and the winning comments to notify.
+    """
+    keys = get_template_keys(args.template_file)
+    if not args.no_posting:
+        keys.add("best_comment_body")
+        if args.notify_winners:
+            keys.update(["best_comment_id", "worst_comment_id", "discussed_comment_id"])
+    return keys
+
+
 def notify_winners(reddit: praw.Reddit, message: str, env_post: dict):
     logger.warning(
         "Notifying winners. Don't do this if you're just testing the script!"
     )
     winning_comments = {
-            env_post["best_comment_id"],
-            env_post["worst_comment_id"],
-            env_post["discussed_comment_id"],
+        env_post["best_comment_id"],
+        env_post["worst_comment_id"],
+        env_post["discussed_comment_id"],
     }
     for i in winning_comments:
         try:
@@ -182,23 +398,21 @@ def notify_winners(reddit: praw.Reddit, message: str, env_post: dict):
             logger.warning(e)
 
 
-def main():
-    args = parse_args()
-
-    report_date = datetime.now().strftime("%Y-%m-%d")
-    formatted_date, min_timestamp, max_timestamp = date_utils.get_timestamp_range(
-        report_date
-    )
-    logger.info(
-        f"Creating report for subreddit {args.subreddit} and day {report_date}."
-    )
-    logger.debug(f"Formatted date: {formatted_date}.")
-    logger.debug(f"Extracting data between {min_timestamp} and {max_timestamp}.")
-
+def check_args(args: argparse.Namespace):
     if not args.post_subreddit and not args.no_posting:
         raise ValueError(
             "You need to set -p/--post_subreddit. You can disable posting with --no_posting."
         )
+    if (args.collect or args.from_store) and not args.store:
+        raise ValueError("You need to set --store to use --collect or --from_store.")
+    if args.archive and (args.collect or args.from_store):
+        raise ValueError("--archive can't be used with --collect or --from_store.")
+    if args.stats_engine == "streaming" and (args.snapshot or args.refresh_scores):
+        raise ValueError(
+            "--snapshot and --refresh_scores need all the comments, they can't be used with --stats_engine streaming."
+        )
+    if not args.template_file:
+        raise ValueError("You need to set -f/--template_file.")
     if not Path(args.template_file).is_file():
         raise FileNotFoundError(f"Template {args.template_file} does not exist.")
     if not args.no_posting:
@@ -220,56 +434,129 @@ def main():
                     f"Template {args.template_file_message} does not exist."
                 )
 
-    if Path.cwd() / "praw.ini":
-        reddit = praw.Reddit("bot", user_agent="python:script:reddit_bestof")
-    else:
-        reddit = praw.Reddit(user_agent="python:script:reddit_bestof")
 
-    locale.setlocale(locale.LC_TIME, "fr_FR.utf8")
-    # pd.to_string() uses this option to truncate its output
-    pd.options.display.max_colwidth = None
+def check_backfill_args(args: argparse.Namespace):
+    if args.record or args.replay or args.collect:
+        raise ValueError(
+            "--backfill can't be used with --record, --replay or --collect."
+        )
+    if not args.no_posting:
+        raise ValueError(
+            "--backfill needs --no_posting, past reports are only exported."
+        )
+    if args.period == "day" and not (args.from_store or args.archive):
+        raise ValueError(
+            "--backfill needs --from_store or --archive, the posts and comments of past days can't be listed on Reddit."
+        )
+    if args.backfill_workers < 1:
+        raise ValueError("--backfill_workers must be at least 1.")
+
+
+def get_jobs(args: argparse.Namespace) -> list:
+    """Return the arguments of each report to create.
+
+    Without --jobs, this is only the command line arguments. Otherwise each
+    job of the JSON file overrides JOB_KEYS in a copy of them.
+    """
+    if not args.jobs:
+        if not args.subreddit:
+            raise ValueError("You need to set -s/--subreddit or --jobs.")
+        return [args]
+    with open(args.jobs) as f:
+        jobs = json.load(f)
+    job_args = []
+    for job in jobs:
+        unknown_keys = set(job) - set(JOB_KEYS)
+        if unknown_keys:
+            raise ValueError(
+                f"Unknown keys in {args.jobs}: {', '.join(sorted(unknown_keys))}."
+            )
+        if "subreddit" not in job:
+            raise ValueError(f"A job of {args.jobs} has no subreddit.")
+        job_args.append(argparse.Namespace(**{**vars(args), **job}))
+    return job_args
 
-    post_ids = get_reddit_ids(
-        reddit, args.subreddit, min_timestamp, max_timestamp, args.test
-    )
 
-    if len(post_ids) == 0:
-        raise ValueError(
-            f"No posts were found on /r/{args.subreddit} for {report_date} (between {min_timestamp} and {max_timestamp})."
+def get_env(
+    reddit: praw.Reddit,
+    metrics: Metrics,
+    args: argparse.Namespace,
+    report_date: str,
+    archive_data: Optional[list] = None,
+) -> dict:
+    formatted_date, min_timestamp, max_timestamp = date_utils.get_timestamp_range(
+        report_date
+    )
+    logger.info(
+        f"Creating {args.period} report for subreddit {args.subreddit} and day {report_date}."
+    )
+    logger.debug(f"Formatted date: {formatted_date}.")
+    logger.debug(f"Extracting data between {min_timestamp} and {max_timestamp}.")
+    keys = get_report_keys(args)
+    if args.period == "day":
+        return get_env_day(
+            reddit,
+            metrics,
+            args,
+            report_date,
+            formatted_date,
+            min_timestamp,
+            max_timestamp,
+            keys,
+            archive_data,
         )
+    with metrics.stage("rollups"):
+        return get_env_period(reddit, args, report_date, keys)
 
-    # Extract current data with praw
-    posts, comments = get_data(reddit, post_ids)
 
-    # Convert to pandas dataframe
-    df_posts = pd.DataFrame(posts)
-    df_comments = pd.DataFrame(comments)
+def get_export_prefix(args: argparse.Namespace, report_date: str) -> str:
+    if args.period == "day":
+        return f"{report_date}_{args.subreddit}"
+    return f"{report_date}_{args.subreddit}_{args.period}"
 
-    # Stats calculation + template evaluation
-    env_post = get_env_post(
-        reddit, df_posts, df_comments, formatted_date, args.subreddit
+
+def is_exported(args: argparse.Namespace, report_date: str) -> bool:
+    """Whether a report of the day was already exported, by any run."""
+    prefix = get_export_prefix(args, report_date)
+    return any(
+        x.stem[len(prefix) + 1 :].isdigit()
+        for x in Path("Exports").glob(f"{prefix}_*.txt")
     )
-    formatted_message = read_template(args.template_file).safe_substitute(env_post)
 
-    filename = f"{report_date}_{args.subreddit}_{int(START_TIME)}.txt"
+
+def send_report(
+    reddit: praw.Reddit,
+    metrics: Metrics,
+    args: argparse.Namespace,
+    report_date: str,
+    env_post: dict,
+):
+    """Export the report of env_post and post it to args.post_subreddit."""
+    with metrics.stage("render"):
+        formatted_message = read_template(args.template_file).safe_substitute(env_post)
+
+    filename = f"{get_export_prefix(args, report_date)}_{int(START_TIME)}.txt"
     logger.info(f"Exporting formatted message to Exports/{filename}")
     Path("Exports").mkdir(parents=True, exist_ok=True)
-    with open(f"Exports/{filename}", "w") as f:
+    # A report interrupted while being written is not seen as exported
+    with open(f"Exports/{filename}.tmp", "w") as f:
         f.write(formatted_message)
+    Path(f"Exports/{filename}.tmp").replace(f"Exports/{filename}")
 
-    env_title = {
-        "date": env_post["date"],
-        "subreddit": env_post["subreddit"],
-        "title": env_post["best_comment_body"],
-    }
     if not args.no_posting:
+        env_title = {
+            "date": env_post["date"],
+            "subreddit": env_post["subreddit"],
+            "title": env_post["best_comment_body"],
+        }
         post_title = read_template(args.template_file_title).safe_substitute(env_title)
         logger.info(
             f"Sending post to {args.post_subreddit}\nTitle: {post_title}\nContent: {formatted_message}"
         )
-        submission = reddit.subreddit(args.post_subreddit).submit(
-            title=post_title, selftext=formatted_message
-        )
+        with metrics.stage("submit"):
+            submission = reddit.subreddit(args.post_subreddit).submit(
+                title=post_title, selftext=formatted_message
+            )
         if args.notify_winners and not args.test:
             env_message = {
                 "reddit_bestof_url": f"https://reddit.com{submission.permalink}"
@@ -277,11 +564,212 @@ def main():
             notify_winners_message = read_template(
                 args.template_file_message
             ).safe_substitute(env_message)
-            notify_winners(reddit, notify_winners_message, env_post)
+            metrics.call(notify_winners, reddit, notify_winners_message, env_post)
     else:
         logger.info(f"Posting is disabled\nContent: {formatted_message}")
 
+
+def get_backfill_reports(jobs: list, days: list) -> list:
+    """Return the (job, day) reports that were not exported yet."""
+    return [(job, day) for day in days for job in jobs if not is_exported(job, day)]
+
+
+def get_backfill_archive_data(args: argparse.Namespace, reports: list) -> dict:
+    """Read the --archive dumps once for all the daily reports of a backfill.
+
+    Return the posts of each (subreddit, day) with their comments, see
+    archive.split_archive_data.
+    """
+    days = sorted({day for _, day in reports})
+    windows = [date_utils.get_timestamp_range(x)[1:] for x in days]
+    subreddits = sorted({job.subreddit.lower() for job, _ in reports})
+    data = archive.read_archives(
+        args.archive,
+        subreddits,
+        min(x[0] for x in windows),
+        max(x[1] for x in windows),
+        args.workers,
+    )
+    archive_data = {}
+    for subreddit in subreddits:
+        for day, window_data in zip(
+            days, archive.split_archive_data(data.pop(subreddit), windows)
+        ):
+            archive_data[subreddit, day] = window_data
+    return archive_data
+
+
+def create_backfill_report(
+    args: argparse.Namespace,
+    report_date: str,
+    requests_per_minute: float,
+    archive_data: Optional[list] = None,
+):
+    """Create and export the report of a past day, in a worker process."""
+    locale.setlocale(locale.LC_TIME, "fr_FR.utf8")
+    pd.options.display.max_colwidth = None
+    stats = RequestStats()
+    reddit = get_reddit(RateLimiter(requests_per_minute), stats)
+    metrics = Metrics(stats, args.subreddit)
+    env_post = get_env(reddit, metrics, args, report_date, archive_data)
+    send_report(reddit, metrics, args, report_date, env_post)
+
+
+def wait_backfill_reports(futures: dict, done: int, total: int) -> list:
+    """Wait for the reports of futures. Return the reports that failed."""
+    failed = []
+    for i, future in enumerate(as_completed(futures), done + 1):
+        job, day = futures[future]
+        try:
+            future.result()
+        except Exception:
+            logger.exception(f"Report for /r/{job.subreddit} and {day} failed.")
+            failed.append(f"/r/{job.subreddit} {day}")
+        logger.info(f"Backfill: {i}/{total} reports done.")
+    return failed
+
+
+def backfill(
+    args: argparse.Namespace,
+    jobs: list,
+    last_day: str,
+    chunk_days: int = BACKFILL_CHUNK_DAYS,
+) -> list:
+    """Create the reports of the days from args.backfill to last_day.
+
+    The reports already exported are skipped, so an interrupted backfill
+    resumes where it stopped. With args.backfill_workers > 1, the days are
+    created by a process pool sharing --requests_per_minute.
+    The days are submitted by chunks of chunk_days. The --archive dumps are
+    read once per chunk, while the reports of the previous chunk run, so
+    only the rows of two chunks are held at once.
+    Return the reports that failed.
+    """
+    days = date_utils.get_days(args.backfill, last_day)
+    reports = get_backfill_reports(jobs, days)
+    logger.info(
+        f"Backfilling {len(reports)} reports, {len(days) * len(jobs) - len(reports)} already exported."
+    )
+    requests_per_minute = args.requests_per_minute / args.backfill_workers
+    # A single report runs in a thread, like the jobs of a normal run
+    if args.backfill_workers > 1:
+        executor = ProcessPoolExecutor(args.backfill_workers)
+    else:
+        executor = ThreadPoolExecutor(1)
+    failed = []
+    done = 0
+    try:
+        futures = {}
+        for i in range(0, len(days), chunk_days):
+            chunk = set(days[i : i + chunk_days])
+            chunk_reports = [x for x in reports if x[1] in chunk]
+            if not chunk_reports:
+                continue
+            archive_data = {}
+            if args.archive and args.period == "day":
+                archive_data = get_backfill_archive_data(args, chunk_reports)
+            chunk_futures = {
+                executor.submit(
+                    create_backfill_report,
+                    job,
+                    day,
+                    requests_per_minute,
+                    archive_data.get((job.subreddit.lower(), day)),
+                ): (job, day)
+                for job, day in chunk_reports
+            }
+            del archive_data
+            failed += wait_backfill_reports(futures, done, len(reports))
+            done += len(futures)
+            futures = chunk_futures
+        failed += wait_backfill_reports(futures, done, len(reports))
+    finally:
+        executor.shutdown(cancel_futures=True)
+    return failed
+
+
+def main():
+    args = parse_args()
+    jobs = get_jobs(args)
+    for job in jobs:
+        check_args(job)
+
+    if args.record and args.replay:
+        raise ValueError("--record and --replay can't be used together.")
+    if args.day and args.replay:
+        raise ValueError(
+            "-d/--day can't be used with --replay, the report is created for the recorded day."
+        )
+
+    report_date = args.day or datetime.now().strftime("%Y-%m-%d")
+    if args.backfill:
+        check_backfill_args(args)
+        locale.setlocale(locale.LC_TIME, "fr_FR.utf8")
+        failed = backfill(args, jobs, report_date)
+        logger.info("Runtime: %.2f seconds." % (time.time() - START_TIME))
+        if failed:
+            raise RuntimeError(f"Reports failed for {', '.join(failed)}.")
+        return
+
+    cassette = None
+    if args.record:
+        cassette = Cassette(args.record, record=True)
+        cassette.metadata["report_date"] = report_date
+    elif args.replay:
+        cassette = Cassette(args.replay, latency=args.replay_latency)
+        report_date = cassette.metadata["report_date"]
+    # One session, connection pool and request budget shared by all the jobs
+    stats = RequestStats()
+    reddit = get_reddit(RateLimiter(args.requests_per_minute), stats, cassette)
+
+    locale.setlocale(locale.LC_TIME, "fr_FR.utf8")
+    # pd.to_string() uses this option to truncate its output
+    pd.options.display.max_colwidth = None
+
+    # The extractions of all the subreddits run together and take turns in
+    # the rate limiter, the reports are then sent in the order of the jobs
+    failed = []
+    metrics = [Metrics(stats, job.subreddit) for job in jobs]
+    try:
+        with ThreadPoolExecutor(max_workers=len(jobs)) as executor:
+            futures = [
+                executor.submit(get_env, reddit, job_metrics, job, report_date)
+                for job, job_metrics in zip(jobs, metrics)
+            ]
+            for job, job_metrics, future in zip(jobs, metrics, futures):
+                try:
+                    send_report(reddit, job_metrics, job, report_date, future.result())
+                except Exception:
+                    if len(jobs) == 1:
+                        raise
+                    logger.exception(f"Report for /r/{job.subreddit} failed.")
+                    failed.append(job.subreddit)
+    finally:
+        if args.record:
+            cassette.save()
+        for job_metrics in metrics:
+            for name, stage in job_metrics.stages.items():
+                logger.debug(
+                    f"/r/{job_metrics.subreddit} {name}: {stage['seconds']:.2f} seconds, {stage['requests']} requests."
+                )
+        if args.metrics:
+            save_metrics(args.metrics, metrics, stats, time.time() - START_TIME)
+
+    counters = stats.get_counters()
+    logger.info(
+        f"{counters['requests']} requests sent to Reddit ({counters['bytes']} bytes, {counters['retries']} retries)."
+    )
     logger.info("Runtime: %.2f seconds." % (time.time() - START_TIME))
+    if failed:
+        raise RuntimeError(f"Reports failed for {', '.join(failed)}.")
+
+
+def parse_day(value: str) -> str:
+    try:
+        datetime.strptime(value, "%Y-%m-%d")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{value} is not a day in format YYYY-MM-DD.")
+    return value
 
 
 def parse_args():
@@ -299,16 +787,14 @@ def parse_args():
     parser.add_argument(
         "-s",
         "--subreddit",
-        help="Subreddit (required, without prefix, example: france)",
+        help="Subreddit (required without --jobs, without prefix, example: france)",
         type=str,
-        required=True,
     )
     parser.add_argument(
         "-f",
         "--template_file",
         help="Template file containing the content of the post (required)",
         type=str,
-        required=True,
     )
     parser.add_argument(
         "-t",
@@ -322,6 +808,12 @@ def parse_args():
         help="Template file containing the message for the winner's notification (required if --notify_winners is set)",
         type=str,
     )
+    parser.add_argument(
+        "-d",
+        "--day",
+        help="Report day in format YYYY-MM-DD (optional, if not set: current day)",
+        type=parse_day,
+    )
     parser.add_argument(
         "-p",
         "--post_subreddit",
@@ -346,6 +838,141 @@ def parse_args():
         dest="notify_winners",
         action="store_true",
     )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        help="Number of threads used to extract submissions and to expand the comment trees of each one, or of processes reading the --archive files (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--more_comments_budget",
+        help='Maximum number of requests expanding the "load more comments" links of the comment trees, biggest first (default: no limit)',
+        type=int,
+    )
+    parser.add_argument(
+        "--more_comments_per_post",
+        help='Maximum number of requests expanding the "load more comments" links of one post (default: no limit)',
+        type=int,
+    )
+    parser.add_argument(
+        "--requests_per_minute",
+        help="Reddit API budget shared by all the workers (default: 100)",
+        type=int,
+        default=100,
+    )
+    parser.add_argument(
+        "--comment_engine",
+        help="How comments are extracted: walking each post's comment tree or reading the subreddit comment listing (default: tree)",
+        choices=COMMENT_ENGINES,
+        default="tree",
+    )
+    parser.add_argument(
+        "--store",
+        help="SQLite file keeping extracted posts and comments, a re-run only fetches the posts whose comments changed (optional)",
+        type=str,
+    )
+    parser.add_argument(
+        "--collect",
+        help="Collect the posts and comments in --store until the end of the day, then create the report from it",
+        dest="collect",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--from_store",
+        help="Create the report from the data already in --store, without extracting anything",
+        dest="from_store",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--archive",
+        help="Create the report from these Pushshift-style NDJSON dumps of submissions and comments instead of the Reddit API (.zst files require zstandard)",
+        nargs="+",
+    )
+    parser.add_argument(
+        "--poll_interval",
+        help="Seconds between two polls with --collect (default: 300)",
+        type=int,
+        default=collector.DEFAULT_POLL_INTERVAL,
+    )
+    parser.add_argument(
+        "--refresh_scores",
+        help="Read the scores of all the extracted posts and comments again just before computing the stats",
+        dest="refresh_scores",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--lazy_bodies",
+        help="Only keep the bodies of the comments that can win an award, the capslock and question counts of the others are computed as they are extracted",
+        dest="lazy_bodies",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--stats_engine",
+        help="How the stats are computed: from frames of all the posts and comments, or updated as they are extracted, with less memory (default: frames)",
+        choices=STATS_ENGINES,
+        default="frames",
+    )
+    parser.add_argument(
+        "--stats_workers",
+        help="Threads computing the stats of the report, independent stats run at the same time (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--no_rollup",
+        help="Don't save the rollup of the day, used by the week, month and year reports. Only the stats used by the templates are then computed",
+        dest="no_rollup",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--period",
+        help="Period of the report. week, month and year reports are created from the rollups saved by the daily reports (default: day)",
+        choices=["day", "week", "month", "year"],
+        default="day",
+    )
+    parser.add_argument(
+        "--snapshot",
+        help="Save the posts and comments of the day as Parquet files in Snapshots, partitioned by subreddit and date (requires pyarrow)",
+        dest="snapshot",
+        action="store_true",
+    )
+    parser.add_argument(
+        "--backfill",
+        help="Create the reports of every day from this day (YYYY-MM-DD) to -d/--day from --store or --archive, skipping the reports already in Exports. Requires --from_store or --archive for daily reports and --no_posting",
+        type=parse_day,
+    )
+    parser.add_argument(
+        "--backfill_workers",
+        help="Number of processes creating the reports of --backfill (default: 1)",
+        type=int,
+        default=1,
+    )
+    parser.add_argument(
+        "--jobs",
+        help="JSON file with a list of reports to create in one run, sharing the Reddit session and --requests_per_minute. Each job sets subreddit and optionally post_subreddit, template_file, template_file_title and template_file_message, the other arguments apply to all the jobs",
+        type=str,
+    )
+    parser.add_argument(
+        "--record",
+        help="Save every request sent to Reddit and its response in this JSON file (.json.gz to compress it)",
+        type=str,
+    )
+    parser.add_argument(
+        "--replay",
+        help="Answer the requests with the responses saved by --record instead of sending them to Reddit. The report is created for the recorded day",
+        type=str,
+    )
+    parser.add_argument(
+        "--replay_latency",
+        help="Seconds each replayed request takes (default: as long as the recorded request)",
+        type=float,
+    )
+    parser.add_argument(
+        "--metrics",
+        help="Save the time and HTTP requests of each stage in this file, in the Prometheus text format if it ends with .prom (for the node exporter textfile collector), in JSON otherwise",
+        type=str,
+    )
     parser.set_defaults(no_posting=False, test=False, notify_winners=False)
     args = parser.parse_args()
 
@@ -0,0 +1,228 @@
+"""Posts and comments read from Pushshift-style archive dumps.
+
+The dumps are NDJSON files of submissions or comments, one object per line,
+usually compressed with zstd (.zst). They are decompressed as a stream and
+only the lines of the subreddit and window are parsed and kept, so dumps of
+many gigabytes are read without loading them in memory.
+zstandard is only needed to read .zst files.
+"""
+
+import io
+import json
+import logging
+import re
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterator, Optional, Tuple
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+# Pushshift dumps are compressed with a long window
+ZSTD_MAX_WINDOW_SIZE = 2**31
+ZSTD_READ_SIZE = 2**24
+
+
+def open_archive(path: str) -> io.TextIOBase:
+    """Open a dump as a stream of lines, decompressing .zst files on the fly."""
+    if not str(path).endswith(".zst"):
+        return open(path, encoding="utf-8")
+    import zstandard
+
+    reader = zstandard.ZstdDecompressor(
+        max_window_size=ZSTD_MAX_WINDOW_SIZE
+    ).stream_reader(open(path, "rb"), read_size=ZSTD_READ_SIZE, closefd=True)
+    return io.TextIOWrapper(reader, encoding="utf-8")
+
+
+def get_archive_post_row(record: dict) -> Optional[dict]:
+    """Build a post row from a dumped submission, like extract.get_post_row.
+
+    Return None if the post is deleted, hidden or not indexable.
+    """
+    author = record.get("author")
+    if (
+        author in [None, "[deleted]"]
+        or record.get("hidden")
+        or not record.get("is_robot_indexable", True)
+    ):
+        return None
+    return {
+        "id": record["id"],
+        "score": int(record["score"]),
+        "author": utils.sanitize_username("/u/" + author),
+        "permalink": f"https://reddit.com{record['permalink']}",
+        "title": record["title"],
+        "timestamp": int(record["created_utc"]),
+        "num_comments": int(record["num_comments"]),
+    }
+
+
+def get_archive_comment_row(record: dict) -> Optional[dict]:
+    """Build a comment row from a dumped comment, like extract.get_comment_row.
+
+    Older dumps have no permalink, it is then built from the post id.
+    Return None if the comment is deleted or posted by AutoModerator.
+    """
+    author = record.get("author")
+    if author is None or author.lower() in ["[deleted]", "automoderator"]:
+        return None
+    permalink = record.get("permalink")
+    if not permalink:
+        permalink = f"/r/{record['subreddit']}/comments/{record['link_id'][3:]}/_/{record['id']}/"
+    body = utils.sanitize_comment_body(record["body"])
+    return {
+        "id": record["id"],
+        "score": int(record["score"]),
+        "author": utils.sanitize_username("/u/" + author),
+        "permalink": utils.sanitize_link(permalink),
+        "body": body,
+        "parent": record["parent_id"],
+        "length": len(body),
+        "timestamp": int(record["created_utc"]),
+    }
+
+
+def read_archive(
+    path: str, subreddits: list, min_timestamp: int, max_timestamp: int
+) -> dict:
+    """Read the posts and comments of subreddits created in the window from a dump.
+
+    Lines that don't contain the name of one of the subreddits are skipped
+    without being parsed. Return the post rows and the (post id, comment row)
+    of the comments of each subreddit (lowercase), in the order of the dump.
+    """
+    name = re.compile("|".join(f'"{re.escape(x)}"' for x in subreddits), re.IGNORECASE)
+    data = {x.lower(): ([], []) for x in subreddits}
+    lines = 0
+    with open_archive(path) as f:
+        for line in f:
+            lines += 1
+            if not name.search(line):
+                continue
+            record = json.loads(line)
+            rows = data.get(str(record.get("subreddit", "")).lower())
+            if rows is None:
+                continue
+            if not min_timestamp <= int(record["created_utc"]) <= max_timestamp:
+                continue
+            if "title" in record:
+                row = get_archive_post_row(record)
+                if row:
+                    rows[0].append(row)
+            else:
+                row = get_archive_comment_row(record)
+                if row:
+                    rows[1].append((record["link_id"][3:], row))
+    posts = sum(len(x[0]) for x in data.values())
+    comments = sum(len(x[1]) for x in data.values())
+    logger.info(
+        f"{path}: {posts} posts and {comments} comments kept out of {lines} lines."
+    )
+    return data
+
+
+def read_archives(
+    paths: list,
+    subreddits: list,
+    min_timestamp: int,
+    max_timestamp: int,
+    workers: int = 1,
+) -> dict:
+    """Read the posts and comments of subreddits created in the window from dumps.
+
+    paths are dumps of submissions or comments, read in parallel by a process
+    pool with workers > 1. Return for each subreddit (lowercase) its posts by
+    id and the comments of each post by id.
+    """
+    read = partial(
+        read_archive,
+        subreddits=subreddits,
+        min_timestamp=min_timestamp,
+        max_timestamp=max_timestamp,
+    )
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(read, paths))
+    else:
+        results = [read(x) for x in paths]
+    data = {x.lower(): ({}, {}) for x in subreddits}
+    for file_data in results:
+        for subreddit, (file_posts, file_comments) in file_data.items():
+            posts, comments = data[subreddit]
+            for post in file_posts:
+                posts[post["id"]] = post
+            for post_id, comment in file_comments:
+                comments.setdefault(post_id, {})[comment["id"]] = comment
+    return data
+
+
+def split_archive_data(data: Tuple[dict, dict], windows: list) -> list:
+    """Posts of each (min_timestamp, max_timestamp) window with their comments.
+
+    data are the posts and comments of a subreddit from read_archives. Posts
+    come newest first, like in the store, and the comments of a post in the
+    order they were created. Only the comments created in the window are
+    kept, as if the report was created at the end of the window. Like with
+    get_data, the timestamp of a comment row is the one of its post.
+    """
+    posts, comments = data
+    posts = sorted(posts.values(), key=lambda x: x["timestamp"], reverse=True)
+    # Newest first, so the bisections are done on the opposite timestamps
+    timestamps = [-x["timestamp"] for x in posts]
+    windows_data = []
+    for min_timestamp, max_timestamp in windows:
+        window_data = []
+        start = bisect_left(timestamps, -max_timestamp)
+        end = bisect_right(timestamps, -min_timestamp)
+        for post in posts[start:end]:
+            post_comments = sorted(
+                (
+                    x
+                    for x in comments.get(post["id"], {}).values()
+                    if min_timestamp <= x["timestamp"] <= max_timestamp
+                ),
+                key=lambda x: x["timestamp"],
+            )
+            window_data.append(
+                (post, [{**x, "timestamp": post["timestamp"]} for x in post_comments])
+            )
+        windows_data.append(window_data)
+    return windows_data
+
+
+def iter_archive_data(
+    paths: list,
+    subreddit: str,
+    min_timestamp: int,
+    max_timestamp: int,
+    workers: int = 1,
+) -> Iterator[Tuple[dict, list]]:
+    """Yield each post of the window with its comments, like iter_submission_data.
+
+    See read_archives and split_archive_data.
+    """
+    data = read_archives(paths, [subreddit], min_timestamp, max_timestamp, workers)
+    (window_data,) = split_archive_data(
+        data[subreddit.lower()], [(min_timestamp, max_timestamp)]
+    )
+    yield from window_data
+
+
+def get_archive_data(
+    paths: list,
+    subreddit: str,
+    min_timestamp: int,
+    max_timestamp: int,
+    workers: int = 1,
+) -> Tuple[list, list]:
+    """Same posts and comments lists as extract.get_data, read from dumps."""
+    posts = []
+    comments = []
+    for post, post_comments in iter_archive_data(
+        paths, subreddit, min_timestamp, max_timestamp, workers
+    ):
+        posts.append(post)
+        comments.extend(post_comments)
+    return posts, comments
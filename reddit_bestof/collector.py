@@ -0,0 +1,163 @@
+"""Collect posts and comments through the day into a Store."""
+
+import logging
+import time
+from typing import Tuple
+
+import praw
+import prawcore
+
+from .extract import (
+    MAX_LISTING_ITEMS,
+    get_comment_row,
+    get_post_row,
+    get_scores,
+    get_submission_data,
+)
+from .store import Store
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two polls of the subreddit listings
+DEFAULT_POLL_INTERVAL = 300
+
+
+def poll_submissions(
+    reddit: praw.Reddit, store: Store, sub: str, min_timestamp: int, max_timestamp: int
+) -> int:
+    """Save the posts created since the last poll. Return the number of new posts.
+
+    The newest-first listing is read until the high-water mark of the
+    previous poll (or min_timestamp for the first one). The mark never goes
+    past max_timestamp, as it is shared by the windows of the subreddit.
+    """
+    high_water_mark = store.get_state(sub, "submissions") or min_timestamp
+    newest_timestamp = high_water_mark
+    count = 0
+    for submission in reddit.subreddit(sub).new(limit=MAX_LISTING_ITEMS):
+        timestamp = int(submission.created_utc)
+        if timestamp < high_water_mark:
+            break
+        # items after the window are skipped: the next window must still reach them
+        newest_timestamp = max(newest_timestamp, min(timestamp, max_timestamp))
+        if timestamp > max_timestamp:
+            continue
+        post = get_post_row(submission)
+        if post:
+            # posts created at the high-water mark can be read twice
+            if store.get_post(post["id"]) is None:
+                count += 1
+            store.save_submission(sub, post)
+    store.set_state(sub, "submissions", newest_timestamp)
+    return count
+
+
+def poll_comments(
+    reddit: praw.Reddit, store: Store, sub: str, min_timestamp: int, max_timestamp: int
+) -> int:
+    """Save the comments posted since the last poll. Return the number of new comments.
+
+    Only the comments of stored posts are kept, as with the tree engine. If
+    the listing ends before the high-water mark, some comments were missed:
+    this is remembered in the "gap" state so refresh fetches the trees again.
+    """
+    high_water_mark = store.get_state(sub, "comments") or min_timestamp
+    newest_timestamp = high_water_mark
+    count = 0
+    scanned = 0
+    for comment in reddit.subreddit(sub).comments(limit=MAX_LISTING_ITEMS):
+        scanned += 1
+        timestamp = int(comment.created_utc)
+        if timestamp < high_water_mark:
+            break
+        # items after the window are skipped: the next window must still reach them
+        newest_timestamp = max(newest_timestamp, min(timestamp, max_timestamp))
+        if timestamp > max_timestamp:
+            continue
+        post_id = comment.link_id.split("_")[-1]
+        post = store.get_post(post_id)
+        if not post:
+            continue
+        row = get_comment_row(comment, post["timestamp"])
+        if row:
+            if not store.has_comment(row["id"]):
+                count += 1
+            store.save_comments(post_id, [row])
+    else:
+        # the listing is capped: older comments can't be reached anymore
+        if scanned == MAX_LISTING_ITEMS:
+            logger.warning(
+                f"Comment listing exhausted before {high_water_mark}, some comments were missed."
+            )
+            store.set_state(sub, "gap", 1)
+    store.set_state(sub, "comments", newest_timestamp)
+    return count
+
+
+def refresh_scores(
+    reddit: praw.Reddit, store: Store, sub: str, min_timestamp: int, max_timestamp: int
+):
+    """Refresh the scores of the stored posts and comments of the window."""
+    post_ids, comment_ids = store.get_ids(sub, min_timestamp, max_timestamp)
+    post_scores, comment_scores = get_scores(reddit, post_ids, comment_ids)
+    store.update_scores(
+        [(i, score, num_comments) for i, (score, num_comments) in post_scores.items()],
+        list(comment_scores.items()),
+    )
+    logger.info(
+        f"Scores refreshed for {len(post_scores)} posts and {len(comment_scores)} comments."
+    )
+
+
+def refresh(
+    reddit: praw.Reddit, store: Store, sub: str, min_timestamp: int, max_timestamp: int
+):
+    """Complete the collected data at the end of the window.
+
+    The comment trees are fetched again only if a poll missed comments,
+    otherwise only the scores are refreshed.
+    """
+    if store.get_state(sub, "gap"):
+        post_ids, _ = store.get_ids(sub, min_timestamp, max_timestamp)
+        logger.info(f"Comments were missed, fetching {len(post_ids)} comment trees.")
+        for post_id in post_ids:
+            post, comments = get_submission_data(reddit, post_id)
+            if post:
+                store.save_submission(sub, post, comments)
+        store.set_state(sub, "gap", 0)
+    refresh_scores(reddit, store, sub, min_timestamp, max_timestamp)
+
+
+def collect(
+    reddit: praw.Reddit,
+    store: Store,
+    sub: str,
+    min_timestamp: int,
+    max_timestamp: int,
+    poll_interval: int = DEFAULT_POLL_INTERVAL,
+) -> Tuple[int, int]:
+    """Poll sub until max_timestamp, then refresh the collected data.
+
+    A poll failing with a Reddit or network error is logged and the next one
+    reads what it missed, as the high-water marks are only saved after a
+    successful poll. Return the number of posts and comments collected.
+    """
+    total_posts = 0
+    total_comments = 0
+    while True:
+        now = time.time()
+        try:
+            posts = poll_submissions(reddit, store, sub, min_timestamp, max_timestamp)
+            # not polled if the posts failed: the comments of unsaved posts are skipped
+            comments = poll_comments(reddit, store, sub, min_timestamp, max_timestamp)
+        except prawcore.PrawcoreException:
+            logger.exception("Poll failed, retrying at the next one.")
+        else:
+            total_posts += posts
+            total_comments += comments
+            logger.info(f"Collected {posts} new posts and {comments} new comments.")
+        if now >= max_timestamp:
+            break
+        time.sleep(min(poll_interval, max_timestamp - now))
+    refresh(reddit, store, sub, min_timestamp, max_timestamp)
+    return total_posts, total_comments
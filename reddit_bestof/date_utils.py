@@ -22,3 +22,44 @@ def get_timestamp_range(value: str) -> Tuple[str, int, int]:
         int(min_datetime.timestamp()),
         int(max_datetime.timestamp()),
     )
+
+
+def get_period_range(value: str, period: str) -> Tuple[str, list]:
+    """Return the formatted period and the list of days it contains.
+
+    The period ends on value: the 7 last days for "week", since the first day
+    of the month for "month" and since the first day of the year for "year".
+    Example: for 2021-11-02 and "month", return the days 2021-11-01 and 2021-11-02.
+    """
+    locale.setlocale(locale.LC_TIME, "fr_FR.utf8")
+    y, m, d = (int(x) for x in value.split("-", 3))
+    last_day = datetime(y, m, d)
+    if period == "week":
+        first_day = last_day - timedelta(days=6)
+        formatted_date = f"de la semaine du {first_day.strftime('%d %b')} au {last_day.strftime('%d %b %Y')}"
+    elif period == "month":
+        first_day = last_day.replace(day=1)
+        formatted_date = f"du mois de {last_day.strftime('%B %Y')}"
+    elif period == "year":
+        first_day = last_day.replace(month=1, day=1)
+        formatted_date = f"de l'année {last_day.year}"
+    else:
+        raise ValueError(f"Unknown period {period}.")
+    return formatted_date, get_days(
+        first_day.strftime("%Y-%m-%d"), last_day.strftime("%Y-%m-%d")
+    )
+
+
+def get_days(first_day: str, last_day: str) -> list:
+    """Return the days from first_day to last_day included.
+
+    Example: for 2021-10-31 and 2021-11-01, return the days 2021-10-31 and 2021-11-01.
+    """
+    first = datetime.strptime(first_day, "%Y-%m-%d")
+    last = datetime.strptime(last_day, "%Y-%m-%d")
+    if last < first:
+        raise ValueError(f"{last_day} is before {first_day}.")
+    return [
+        (first + timedelta(days=i)).strftime("%Y-%m-%d")
+        for i in range((last - first).days + 1)
+    ]
@@ -0,0 +1,152 @@
+"""Budgeted expansion of the MoreComments stubs of comment trees."""
+
+import heapq
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import praw
+from praw.models import MoreComments
+
+logger = logging.getLogger(__name__)
+
+
+class ExpansionBudget:
+    """MoreComments requests allowed for a run, shared by all the threads.
+
+    requests caps the expansion requests of the whole run and per_submission
+    the ones of each post (None: no limit). Stubs of a post are expanded
+    workers at a time.
+    Also counts the comments recovered by each request, the stubs left
+    unexpanded and the time spent expanding (summed over the posts).
+    "continue this thread" stubs don't tell how many comments they hide, so
+    skipped_comments is a lower bound.
+    """
+
+    def __init__(
+        self,
+        requests: Optional[int] = None,
+        per_submission: Optional[int] = None,
+        workers: int = 1,
+    ):
+        self.remaining = requests
+        self.per_submission = per_submission
+        self.workers = workers
+        self.recovered = []
+        self.skipped_stubs = 0
+        self.skipped_comments = 0
+        self.seconds = 0.0
+        self._lock = threading.Lock()
+
+    def take(self) -> bool:
+        """Use one request of the budget. Return False if it is exhausted."""
+        with self._lock:
+            if self.remaining is None:
+                return True
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+    def add_request(self, comments: int):
+        with self._lock:
+            self.recovered.append(comments)
+
+    def add_seconds(self, seconds: float):
+        with self._lock:
+            self.seconds += seconds
+
+    def skip(self, stub: MoreComments):
+        with self._lock:
+            self.skipped_stubs += 1
+            self.skipped_comments += stub.count
+
+    def summary(self) -> str:
+        requests = len(self.recovered)
+        recovered = sum(self.recovered)
+        return (
+            f"{requests} MoreComments requests recovered {recovered} comments "
+            f"({recovered / max(requests, 1):.1f} per request), "
+            f"{self.skipped_stubs} stubs hiding at least {self.skipped_comments} comments were skipped."
+        )
+
+
+def fetch_stub(stub: MoreComments) -> list:
+    """Send the request expanding a stub. Return the comments and stubs it hid."""
+    return stub.comments(update=True)
+
+
+def expand_comments(
+    submission: praw.models.Submission, budget: ExpansionBudget = None
+) -> list:
+    """Return all the comments of a submission, expanding its MoreComments stubs.
+
+    Stubs are expanded biggest first, as CommentForest.replace_more does,
+    until the budget or its per_submission cap is reached. With
+    budget.workers > 1, the next stubs of the queue are expanded
+    concurrently.
+    The comments are in the same order as CommentForest.list: breadth first,
+    the replies of a comment in the order they were found.
+    """
+    budget = budget or ExpansionBudget()
+    replies = defaultdict(list)
+    found = []
+    stubs = []
+
+    def add(items) -> int:
+        """Index the comments of items and of their replies. Return their number."""
+        count = 0
+        queue = deque(items)
+        while queue:
+            item = queue.popleft()
+            if isinstance(item, MoreComments):
+                item.submission = submission
+                heapq.heappush(stubs, item)
+                continue
+            replies[item.parent_id].append(item)
+            found.append(item)
+            count += 1
+            queue.extend(getattr(item, "replies", []))
+        return count
+
+    add(submission.comments)
+    requests = 0
+    start = time.perf_counter()
+    executor = ThreadPoolExecutor(budget.workers) if budget.workers > 1 else None
+    try:
+        while stubs:
+            batch = []
+            while stubs and len(batch) < budget.workers:
+                stub = heapq.heappop(stubs)
+                if (
+                    budget.per_submission is not None
+                    and requests >= budget.per_submission
+                ) or not budget.take():
+                    budget.skip(stub)
+                    continue
+                requests += 1
+                batch.append(stub)
+            results = (
+                executor.map(fetch_stub, batch) if executor else map(fetch_stub, batch)
+            )
+            for new_items in results:
+                budget.add_request(add(new_items))
+    finally:
+        if executor:
+            executor.shutdown()
+        budget.add_seconds(time.perf_counter() - start)
+
+    comments = []
+    queue = deque(replies[submission.fullname])
+    while queue:
+        comment = queue.popleft()
+        comments.append(comment)
+        queue.extend(replies[comment.fullname])
+    if len(comments) < len(found):
+        # comments whose parent wasn't found, kept after the tree
+        listed = {x.fullname for x in comments}
+        comments.extend(x for x in found if x.fullname not in listed)
+    return comments
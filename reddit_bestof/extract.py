@@ -0,0 +1,364 @@
+"""Extract posts and comments from Reddit."""
+
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Iterator, Optional, Tuple, Union
+
+import pandas as pd
+import praw
+from tqdm import tqdm
+
+from . import utils
+from .expand import ExpansionBudget, expand_comments
+from .frames import FramesBuilder
+from .store import Store
+
+logger = logging.getLogger(__name__)
+LISTING_PAGE_SIZE = 100
+# Reddit never returns more than 1000 items in a listing
+MAX_LISTING_ITEMS = 1000
+# Comments returned by the first request of a comment tree
+COMMENT_TREE_PAGE_SIZE = 200
+COMMENT_ENGINES = ["tree", "listing"]
+
+
+def get_reddit_submissions(
+    reddit: praw.Reddit, sub: str, min_timestamp: int, max_timestamp: int, test: bool
+) -> list:
+    """Return the posts created between min_timestamp and max_timestamp.
+
+    The listing objects are returned as is: they already contain everything
+    needed to build the post rows, so get_data doesn't fetch them again.
+
+    The newest-first listing is consumed as a stream: posts newer than
+    max_timestamp are skipped and the scan stops at the first post older than
+    min_timestamp, or after the MAX_LISTING_ITEMS Reddit returns.
+    """
+    limit = LISTING_PAGE_SIZE if test else MAX_LISTING_ITEMS
+    submissions = []
+    scanned = 0
+    reached_window_start = False
+    for submission in reddit.subreddit(sub).new(limit=limit):
+        scanned += 1
+        timestamp = int(submission.created_utc)
+        if timestamp < min_timestamp:
+            reached_window_start = True
+            break
+        if timestamp <= max_timestamp:
+            submissions.append(submission)
+    if not reached_window_start and scanned == limit:
+        logger.warning(
+            f"Listing limit of {limit} posts reached before {min_timestamp}, some posts might be missing."
+        )
+    pages = math.ceil(scanned / LISTING_PAGE_SIZE)
+    logger.debug(
+        f"Posts scanned with praw API: {scanned} in {pages} pages "
+        f"({math.ceil(limit / LISTING_PAGE_SIZE) - pages} pages saved)."
+    )
+    return submissions
+
+
+def get_post_row(submission: praw.models.Submission) -> Optional[dict]:
+    """Build a post row from a Submission.
+
+    Return None if the post is deleted, hidden or not indexable.
+    """
+    author = str(submission.author)
+    if (
+        author.lower() in ["none"]
+        or submission.hidden
+        or not submission.is_robot_indexable
+    ):
+        return None
+    return {
+        "id": submission.id,
+        "score": submission.score,
+        "author": utils.sanitize_username("/u/" + author),
+        "permalink": f"https://reddit.com{submission.permalink}",
+        "title": submission.title,
+        "timestamp": int(submission.created_utc),
+        "num_comments": submission.num_comments,
+    }
+
+
+def get_comment_row(comment: praw.models.Comment, timestamp: int) -> Optional[dict]:
+    """Build a comment row from a Comment.
+
+    Return None if the comment is deleted or posted by AutoModerator.
+    """
+    author = str(comment.author)
+    if author.lower() in ["none", "automoderator"]:
+        return None
+    body = utils.sanitize_comment_body(comment.body)
+    return {
+        "id": comment.id,
+        "score": comment.score,
+        "author": utils.sanitize_username("/u/" + author),
+        "permalink": utils.sanitize_link(comment.permalink),
+        "body": body,
+        "parent": comment.parent_id,
+        "length": len(body),
+        "timestamp": timestamp,
+    }
+
+
+def get_submission_data(
+    reddit: praw.Reddit,
+    submission: Union[str, praw.models.Submission],
+    store: Store = None,
+    budget: ExpansionBudget = None,
+) -> Tuple[dict, list]:
+    """Extract a post and all its comments.
+
+    submission is either a post id or a Submission from a listing. Filtering
+    and post rows only use the listing data, the only request left is the one
+    fetching the comment tree.
+    With a store, the comment tree is only fetched again if the number of
+    comments changed since it was saved.
+    The MoreComments stubs of the tree are expanded within budget (no limit
+    by default).
+    Return (None, []) if the post is deleted, hidden or not indexable.
+    """
+    if isinstance(submission, str):
+        submission = reddit.submission(submission)
+    post = get_post_row(submission)
+    if not post:
+        return None, []
+    if store:
+        stored_post = store.get_post(post["id"])
+        if stored_post and stored_post["num_comments"] == post["num_comments"]:
+            store.save_submission(str(submission.subreddit), post)
+            return post, store.get_comments(post["id"])
+    comments = []
+    for comment in expand_comments(submission, budget):
+        row = get_comment_row(comment, post["timestamp"])
+        if row:
+            comments.append(row)
+    if store:
+        store.save_submission(str(submission.subreddit), post, comments)
+    return post, comments
+
+
+def get_tree_request_estimate(posts: list) -> int:
+    """Estimate the requests needed to walk the comment trees of posts.
+
+    One request per post returns up to COMMENT_TREE_PAGE_SIZE comments, then
+    each MoreComments expansion returns up to LISTING_PAGE_SIZE comments.
+    """
+    return sum(
+        1
+        + math.ceil(
+            max(post["num_comments"] - COMMENT_TREE_PAGE_SIZE, 0) / LISTING_PAGE_SIZE
+        )
+        for post in posts
+    )
+
+
+def get_listing_data(
+    reddit: praw.Reddit,
+    sub: str,
+    submissions: list,
+    min_timestamp: int,
+    max_timestamp: int,
+) -> Tuple[list, list]:
+    """Extract posts and comments without walking the comment trees.
+
+    Post rows are built from the listing Submissions. Comments are read from
+    the newest-first /r/<sub>/comments listing, 100 per request, and kept if
+    they were created between min_timestamp and max_timestamp and don't
+    belong to an excluded post. Each listed comment carries its parent_id, so
+    the parent links used by get_discussed_comment and get_amoureux are the
+    same as with the trees.
+
+    Reddit doesn't return more than MAX_LISTING_ITEMS comments in a listing,
+    so this engine only covers the whole window on quieter subreddits.
+    """
+    posts = []
+    excluded_posts = set()
+    for submission in submissions:
+        post = get_post_row(submission)
+        if post:
+            posts.append(post)
+        else:
+            excluded_posts.add(f"t3_{submission.id}")
+    comments = []
+    scanned = 0
+    for comment in tqdm(
+        reddit.subreddit(sub).comments(limit=MAX_LISTING_ITEMS), dynamic_ncols=True
+    ):
+        scanned += 1
+        timestamp = int(comment.created_utc)
+        if timestamp < min_timestamp:
+            break
+        if timestamp > max_timestamp or comment.link_id in excluded_posts:
+            continue
+        row = get_comment_row(comment, timestamp)
+        if row:
+            comments.append(row)
+    else:
+        if scanned == MAX_LISTING_ITEMS:
+            logger.warning(
+                f"Comment listing exhausted before {min_timestamp}, some comments are missing."
+            )
+    pages = math.ceil(scanned / LISTING_PAGE_SIZE)
+    estimate = get_tree_request_estimate(posts)
+    logger.info(
+        f"Comment listing engine: {pages} requests, "
+        f"tree engine estimate: {estimate} requests ({estimate - pages} saved)."
+    )
+    return posts, comments
+
+
+def get_data(
+    reddit: praw.Reddit,
+    submissions: list,
+    workers: int = 1,
+    store: Store = None,
+    budget: ExpansionBudget = None,
+) -> Tuple[list, list]:
+    """Extract posts and comments from a list of posts (ids or Submissions).
+
+    With workers > 1, submissions are fetched by a thread pool. The results
+    keep the order of submissions so both modes return the same lists.
+    Extracted posts are saved in store if set.
+    """
+    posts = []
+    comments = []
+    for post, post_comments in iter_submission_data(
+        reddit, submissions, workers, store, budget
+    ):
+        posts.append(post)
+        comments.extend(post_comments)
+    return posts, comments
+
+
+def get_data_frames(
+    reddit: praw.Reddit,
+    submissions: list,
+    workers: int = 1,
+    store: Store = None,
+    budget: ExpansionBudget = None,
+    keep_bodies: bool = True,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Same as get_data, but the rows are written into typed frames as they come.
+
+    Only the rows of the posts being extracted are kept as dicts. Without
+    keep_bodies, most comment bodies are dropped, see FramesBuilder.
+    """
+    builder = FramesBuilder(keep_bodies)
+    add_submission_data(builder, reddit, submissions, workers, store, budget)
+    return builder.get_frames()
+
+
+def add_submission_data(
+    builder,
+    reddit: praw.Reddit,
+    submissions: list,
+    workers: int = 1,
+    store: Store = None,
+    budget: ExpansionBudget = None,
+):
+    """Add the posts and comments of submissions to builder as they are extracted.
+
+    builder is a frames.FramesBuilder or a streaming.StreamingStats.
+    """
+    for post, post_comments in iter_submission_data(
+        reddit, submissions, workers, store, budget
+    ):
+        builder.add_post(post)
+        builder.add_comments(post_comments)
+
+
+def iter_submission_data(
+    reddit: praw.Reddit,
+    submissions: list,
+    workers: int = 1,
+    store: Store = None,
+    budget: ExpansionBudget = None,
+) -> Iterator[Tuple[dict, list]]:
+    """Yield the post and comments of each submission that is kept, in order."""
+    extract = partial(get_submission_data, reddit, store=store, budget=budget)
+    if workers > 1:
+        executor = ThreadPoolExecutor(max_workers=workers)
+        results = executor.map(extract, submissions)
+    else:
+        executor = None
+        results = (extract(i) for i in submissions)
+    try:
+        for post, post_comments in tqdm(
+            results, total=len(submissions), dynamic_ncols=True
+        ):
+            if post:
+                yield post, post_comments
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+
+
+def get_scores(
+    reddit: praw.Reddit, post_ids: list, comment_ids: list
+) -> Tuple[dict, dict]:
+    """Read the current scores of posts and comments through /api/info.
+
+    reddit.info sends the fullnames 100 per request.
+    Return {post_id: (score, num_comments)} and {comment_id: score}. Items that
+    Reddit doesn't return anymore are missing from the results.
+    """
+    fullnames = [f"t3_{x}" for x in post_ids] + [f"t1_{x}" for x in comment_ids]
+    post_scores = {}
+    comment_scores = {}
+    for thing in reddit.info(fullnames=fullnames):
+        if thing.fullname.startswith("t3_"):
+            post_scores[thing.id] = (thing.score, thing.num_comments)
+        else:
+            comment_scores[thing.id] = thing.score
+    return post_scores, comment_scores
+
+
+def refresh_scores(reddit: praw.Reddit, posts: list, comments: list):
+    """Update in place the score and num_comments of post and comment rows."""
+    post_scores, comment_scores = get_scores(
+        reddit, [x["id"] for x in posts], [x["id"] for x in comments]
+    )
+    for post in posts:
+        if post["id"] in post_scores:
+            post["score"], post["num_comments"] = post_scores[post["id"]]
+    for comment in comments:
+        comment["score"] = comment_scores.get(comment["id"], comment["score"])
+    logger.info(
+        f"Scores refreshed for {len(post_scores)} posts and {len(comment_scores)} comments."
+    )
+
+
+def refresh_frame_scores(
+    reddit: praw.Reddit, df_posts: pd.DataFrame, df_comments: pd.DataFrame
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Same as refresh_scores for frames. Return the updated frames."""
+    post_scores, comment_scores = get_scores(
+        reddit, df_posts["id"].tolist(), df_comments["id"].tolist()
+    )
+    updates = {
+        "score": {i: score for i, (score, _) in post_scores.items()},
+        "num_comments": {i: num for i, (_, num) in post_scores.items()},
+    }
+    df_posts = df_posts.assign(
+        **{
+            column: df_posts["id"]
+            .map(values)
+            .fillna(df_posts[column])
+            .astype(df_posts[column].dtype)
+            for column, values in updates.items()
+        }
+    )
+    df_comments = df_comments.assign(
+        score=df_comments["id"]
+        .map(comment_scores)
+        .fillna(df_comments["score"])
+        .astype(df_comments["score"].dtype)
+    )
+    logger.info(
+        f"Scores refreshed for {len(post_scores)} posts and {len(comment_scores)} comments."
+    )
+    return df_posts, df_comments
@@ -0,0 +1,280 @@
+"""Posts and comments frames built from typed column buffers."""
+
+import heapq
+import logging
+from array import array
+from collections import Counter
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+import praw
+
+from . import utils
+from .graph import ReplyGraph, get_reply_graph
+from .rollup import ROLLUP_TOP
+
+logger = logging.getLogger(__name__)
+# Bodies waiting for their capslock and question counts, computed in chunks
+FEATURES_CHUNK_SIZE = 10000
+
+
+class Categories:
+    """Interned values of a categorical column, shared between frames."""
+
+    def __init__(self):
+        self.values = []
+        self._codes = {}
+
+    def get_code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def get_categorical(self, codes: np.ndarray) -> pd.Categorical:
+        """Categorical of codes, with the categories in lexical order.
+
+        Sorting, groupbys and ties then give the same results as with str
+        columns.
+        """
+        values = np.array(self.values, dtype=object)
+        order = np.argsort(values, kind="stable")
+        new_codes = np.empty(len(order), dtype=np.int32)
+        new_codes[order] = np.arange(len(order), dtype=np.int32)
+        return pd.Categorical.from_codes(
+            new_codes[codes], pd.Index(values[order], dtype=str)
+        )
+
+
+class Candidates:
+    """Keys with the top values added so far.
+
+    Ties are broken by position, the first key added wins like with
+    nlargest and nsmallest. Keys are only dropped once twice as many as
+    needed are kept.
+    """
+
+    def __init__(self, top: int, largest: bool = True):
+        self.top = top
+        self.sign = 1 if largest else -1
+        self.values = {}
+
+    def add(self, key: str, value: int, position: int) -> list:
+        """Add a key. Return the keys that are not candidates anymore."""
+        self.values[key] = (self.sign * value, -position)
+        if len(self.values) <= 2 * self.top:
+            return []
+        threshold = heapq.nlargest(self.top, self.values.values())[-1]
+        dropped = [k for k, v in self.values.items() if v < threshold]
+        for k in dropped:
+            del self.values[k]
+        return dropped
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.values
+
+
+class FramesBuilder:
+    """Posts and comments rows written straight into typed column buffers.
+
+    No dict is kept per row: scores and lengths are stored as int32,
+    timestamps as int64, authors as categories shared by both frames.
+    Comments don't keep their permalink, only the one of their post as a
+    category, see utils.get_permalinks.
+
+    Without keep_bodies, the capslock and question counts of comments are
+    computed as they are added, in chunks, and only the bodies of the current
+    candidates of the comment awards and rollups are kept: the top comments
+    by score (best and worst) and by number of answers. Each call to
+    add_comments must then contain all the replies of its comments, as the
+    comments of a post do. The other bodies are missing (NA), see
+    fetch_missing_bodies.
+    """
+
+    def __init__(self, keep_bodies: bool = True, top: int = ROLLUP_TOP):
+        self.keep_bodies = keep_bodies
+        self.authors = Categories()
+        self.post_permalinks = Categories()
+        self.posts = {
+            "id": [],
+            "score": array("i"),
+            "author": array("i"),
+            "permalink": [],
+            "title": [],
+            "timestamp": array("q"),
+            "num_comments": array("i"),
+        }
+        self.comments = {
+            "id": [],
+            "score": array("i"),
+            "author": array("i"),
+            "post_permalink": array("i"),
+            "body": [],
+            "parent": [],
+            "length": array("i"),
+            "timestamp": array("q"),
+        }
+        if not keep_bodies:
+            del self.comments["body"]
+            self.comments["capslock"] = array("i")
+            self.comments["question"] = array("i")
+            self.bodies = {}
+            self.pending_bodies = []
+            self.candidates = [
+                Candidates(top),
+                Candidates(top, largest=False),
+                Candidates(top),
+            ]
+
+    def add_post(self, post: dict):
+        for name, column in self.posts.items():
+            if name == "author":
+                column.append(self.authors.get_code(post["author"]))
+            else:
+                column.append(post[name])
+
+    def add_comments(self, comments: list):
+        columns = self.comments
+        for comment in comments:
+            end = comment["id"] + utils.COMMENT_LINK_END
+            if not comment["permalink"].endswith(end):
+                raise ValueError(
+                    f"Permalink {comment['permalink']} doesn't end with {end}."
+                )
+            columns["id"].append(comment["id"])
+            columns["score"].append(comment["score"])
+            columns["author"].append(self.authors.get_code(comment["author"]))
+            columns["post_permalink"].append(
+                self.post_permalinks.get_code(comment["permalink"][: -len(end)])
+            )
+            columns["parent"].append(comment["parent"])
+            columns["length"].append(comment["length"])
+            columns["timestamp"].append(comment["timestamp"])
+            if self.keep_bodies:
+                columns["body"].append(comment["body"])
+            else:
+                self.pending_bodies.append(comment["body"])
+        if not self.keep_bodies:
+            self.add_candidates(comments)
+            if len(self.pending_bodies) >= FEATURES_CHUNK_SIZE:
+                self.add_features()
+
+    def add_features(self):
+        """Count the capslock characters and questions of the pending bodies."""
+        body = pd.Series(self.pending_bodies, dtype=str)
+        for name, counts in [
+            ("capslock", utils.count_capslock(body)),
+            ("question", utils.count_questions(body)),
+        ]:
+            self.comments[name].frombytes(counts.to_numpy(np.int32).tobytes())
+        self.pending_bodies = []
+
+    def add_candidates(self, comments: list):
+        """Keep the bodies of the comments that are candidates, drop the others.
+
+        The answers of a comment are ranked like with value_counts: ties are
+        broken by the position of their first answer.
+        """
+        best, worst, discussed = self.candidates
+        start = len(self.comments["id"]) - len(comments)
+        answers = Counter()
+        first_answers = {}
+        for position, comment in enumerate(comments, start):
+            if comment["parent"].startswith("t1_"):
+                answers[comment["parent"][3:]] += 1
+                first_answers.setdefault(comment["parent"][3:], position)
+        for position, comment in enumerate(comments, start):
+            self.bodies[comment["id"]] = comment["body"]
+            dropped = best.add(comment["id"], comment["score"], position)
+            dropped += worst.add(comment["id"], comment["score"], position)
+            if comment["id"] in answers:
+                dropped += discussed.add(
+                    comment["id"],
+                    answers[comment["id"]],
+                    first_answers[comment["id"]],
+                )
+            for key in dropped:
+                if not any(key in x for x in self.candidates):
+                    self.bodies.pop(key, None)
+
+    def get_frame(self, columns: dict) -> pd.DataFrame:
+        categories = {
+            "author": self.authors,
+            "post_permalink": self.post_permalinks,
+        }
+        data = {}
+        for name, column in columns.items():
+            if name in categories:
+                data[name] = categories[name].get_categorical(
+                    np.frombuffer(column, dtype=np.int32)
+                )
+            elif isinstance(column, array):
+                data[name] = np.frombuffer(
+                    column, dtype=np.int32 if column.typecode == "i" else np.int64
+                )
+            else:
+                # Inferred like the str columns of a DataFrame of rows, without
+                # the fixed-width copy of dtype=str on pandas 2
+                data[name] = np.array(column, dtype=object)
+        return pd.DataFrame(data)
+
+    def get_frames(self) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        if not self.keep_bodies:
+            self.add_features()
+        df_comments = self.get_frame(self.comments)
+        if not self.keep_bodies:
+            df_comments.insert(
+                4,
+                "body",
+                np.array(
+                    [self.bodies.get(x) for x in self.comments["id"]], dtype=object
+                ),
+            )
+        return self.get_frame(self.posts), df_comments
+
+
+def get_frames(
+    posts: list, comments: list, keep_bodies: bool = True
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Typed frames of lists of post and comment rows."""
+    builder = FramesBuilder(keep_bodies)
+    for post in posts:
+        builder.add_post(post)
+    builder.add_comments(comments)
+    return builder.get_frames()
+
+
+def fetch_missing_bodies(
+    reddit: praw.Reddit,
+    df_comments: pd.DataFrame,
+    top: int = ROLLUP_TOP,
+    reply_graph: ReplyGraph = None,
+) -> pd.DataFrame:
+    """Fetch the bodies of the award and rollup comments that were dropped.
+
+    This only happens if the scores changed after the frame was built, with
+    --refresh_scores. Return df_comments with the bodies filled.
+    """
+    if reply_graph is None:
+        reply_graph = get_reply_graph(df_comments)
+    ids = pd.concat(
+        [
+            df_comments.nlargest(top, "score")["id"],
+            df_comments.nsmallest(top, "score")["id"],
+            reply_graph.ids[reply_graph.get_most_answered(top)].to_series(),
+        ]
+    )
+    missing = df_comments["id"].isin(ids) & df_comments["body"].isna()
+    if not missing.any():
+        return df_comments
+    # Comments deleted since then get an empty body
+    bodies = dict.fromkeys(df_comments.loc[missing, "id"], "")
+    fullnames = [f"t1_{x}" for x in bodies]
+    for comment in reddit.info(fullnames=fullnames):
+        bodies[comment.id] = utils.sanitize_comment_body(comment.body)
+    logger.info(f"Bodies of {len(fullnames)} comments fetched again.")
+    return df_comments.assign(
+        body=df_comments["body"].fillna(df_comments["id"].map(bodies))
+    )
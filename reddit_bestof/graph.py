@@ -0,0 +1,82 @@
+"""Reply graph of the comments of a window, built once from their parent column."""
+
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+class ReplyGraph:
+    """Comments linked to the comments they answer.
+
+    Nodes are integer codes: the comments of df_comments first, in the order
+    of their rows, then the answered comments that are not in df_comments.
+    ids is the hash index between nodes and comment ids, rows the row of each
+    node (the first one for duplicated ids, -1 outside df_comments) and
+    parents the node answered by each row (-1 for the answers to posts).
+    The answers of a node are stored like a CSR matrix: their rows are
+    children[offsets[node] : offsets[node + 1]], in row order.
+    """
+
+    def __init__(self, df_comments: pd.DataFrame):
+        is_reply = df_comments["parent"].str.startswith("t1_").to_numpy(bool)
+        reply_rows = np.flatnonzero(is_reply)
+        codes, ids = pd.factorize(
+            pd.concat(
+                [
+                    df_comments["id"].astype(str),
+                    df_comments["parent"].iloc[reply_rows].str.slice(3).astype(str),
+                ],
+                ignore_index=True,
+            )
+        )
+        row_codes = codes[: len(df_comments)]
+        parent_codes = codes[len(df_comments) :]
+        self.ids = pd.Index(ids)
+        self.rows = np.full(len(ids), -1, dtype=np.int64)
+        # Codes are given in order of appearance, the comments come first
+        comment_nodes, first_rows = np.unique(row_codes, return_index=True)
+        self.rows[comment_nodes] = first_rows
+        self.parents = np.full(len(df_comments), -1, dtype=np.int64)
+        self.parents[reply_rows] = parent_codes
+        self.children = reply_rows[np.argsort(parent_codes, kind="stable")]
+        self.answers = np.bincount(parent_codes, minlength=len(ids))
+        self.offsets = np.concatenate([[0], np.cumsum(self.answers)])
+
+    def get_node(self, comment_id: str) -> int:
+        """Node of a comment id, -1 if it is not in the graph."""
+        try:
+            return self.ids.get_loc(comment_id)
+        except KeyError:
+            return -1
+
+    def get_children(self, node: int) -> np.ndarray:
+        """Rows of the answers of node."""
+        return self.children[self.offsets[node] : self.offsets[node + 1]]
+
+    def get_most_answered(self, top: int) -> np.ndarray:
+        """Nodes with the most answers.
+
+        Ties are broken by the row of their first answer, like with
+        value_counts on the parent column.
+        """
+        nodes = np.flatnonzero(self.answers)
+        first_answers = self.children[self.offsets[nodes]]
+        order = np.lexsort((first_answers, -self.answers[nodes]))
+        return nodes[order[:top]]
+
+    def get_reply_pairs(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows of the answers to comments that are themselves answers.
+
+        Return these rows and the rows of the comments they answer.
+        """
+        replies = np.flatnonzero(self.parents >= 0)
+        replied = self.rows[self.parents[replies]]
+        found = replied >= 0
+        replies, replied = replies[found], replied[found]
+        is_reply = self.parents[replied] >= 0
+        return replies[is_reply], replied[is_reply]
+
+
+def get_reply_graph(df_comments: pd.DataFrame) -> ReplyGraph:
+    return ReplyGraph(df_comments)
@@ -0,0 +1,107 @@
+"""Wall time and HTTP counters of the stages of a run, saved for monitoring."""
+
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .requestor import RequestStats
+
+logger = logging.getLogger(__name__)
+
+STAGE_VALUES = ["seconds", "calls", "requests", "bytes", "retries"]
+
+
+class Metrics:
+    """Stages of the report of a subreddit.
+
+    The HTTP counters of a stage are the ones of stats while it ran, so stages
+    running at the same time in other threads (reports created with --jobs)
+    are counted in each other.
+    """
+
+    def __init__(self, stats: RequestStats = None, subreddit: str = ""):
+        self.stats = stats or RequestStats()
+        self.subreddit = subreddit
+        self.stages = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, **values):
+        with self._lock:
+            stage = self.stages.setdefault(name, dict.fromkeys(STAGE_VALUES, 0))
+            stage["calls"] += 1
+            for key, value in values.items():
+                stage[key] += value
+
+    @contextmanager
+    def stage(self, name: str):
+        before = self.stats.get_counters()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            after = self.stats.get_counters()
+            self.add(
+                name,
+                seconds=seconds,
+                **{key: after[key] - before[key] for key in after},
+            )
+
+    def call(self, function, *args, **kwargs):
+        """Return function(*args, **kwargs), measured in a stage named after it."""
+        with self.stage(function.__name__):
+            return function(*args, **kwargs)
+
+
+def get_prometheus_text(metrics: list, stats: RequestStats, runtime: float) -> str:
+    """Metrics of a run in the Prometheus text format."""
+    lines = []
+    for key in STAGE_VALUES:
+        name = f"reddit_bestof_stage_{key}"
+        lines.append(f"# HELP {name} {key} of each stage of the last run.")
+        lines.append(f"# TYPE {name} gauge")
+        for job in metrics:
+            for stage, values in job.stages.items():
+                lines.append(
+                    f'{name}{{subreddit="{job.subreddit}",stage="{stage}"}} {values[key]}'
+                )
+    counters = {
+        "reddit_bestof_run_seconds": runtime,
+        "reddit_bestof_last_run_timestamp_seconds": int(time.time()),
+        **{
+            f"reddit_bestof_{key}": value for key, value in stats.get_counters().items()
+        },
+    }
+    for name, value in counters.items():
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def save_metrics(path: str, metrics: list, stats: RequestStats, runtime: float):
+    """Save the metrics of a run, in the Prometheus text format if path ends with .prom.
+
+    The file is replaced atomically so that the node exporter never reads a
+    partial file.
+    """
+    path = Path(path)
+    if path.suffix == ".prom":
+        content = get_prometheus_text(metrics, stats, runtime)
+    else:
+        content = json.dumps(
+            {
+                "runtime": runtime,
+                **stats.get_counters(),
+                "subreddits": {x.subreddit: x.stages for x in metrics},
+            },
+            indent=2,
+        )
+    temporary_path = path.with_name(f".{path.name}.tmp")
+    with open(temporary_path, "w") as f:
+        f.write(content)
+    os.replace(temporary_path, path)
+    logger.info(f"Metrics saved in {path}.")
@@ -0,0 +1,220 @@
+"""HTTP layer shared by every praw call made by reddit_bestof."""
+
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Optional
+
+import prawcore
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Reddit allows 100 queries per minute for an OAuth client.
+DEFAULT_REQUESTS_PER_MINUTE = 100
+
+
+class RateLimiter:
+    """Thread-safe token bucket shared by all the threads using a Reddit session.
+
+    Tokens are refilled continuously at requests_per_minute / 60 per second,
+    up to burst tokens, so short bursts are allowed while the average rate
+    stays under the budget.
+    """
+
+    def __init__(
+        self, requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE, burst: int = 10
+    ):
+        self.rate = requests_per_minute / 60
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """Block until a request can be sent. Return the time waited in seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.burst, self._tokens + (now - self._last_refill) * self.rate
+            )
+            self._last_refill = now
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class RequestStats:
+    """Thread-safe counters of the HTTP requests sent by a Reddit session.
+
+    retries counts the requests that failed with an error prawcore retries.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.bytes = 0
+        self.retries = 0
+        self._lock = threading.Lock()
+
+    def add_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def add_response(self, response: requests.Response):
+        with self._lock:
+            self.bytes += len(response.content)
+            if response.status_code in prawcore.Session.RETRY_STATUSES:
+                self.retries += 1
+
+    def add_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def get_counters(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "bytes": self.bytes,
+                "retries": self.retries,
+            }
+
+
+class Cassette:
+    """HTTP exchanges with Reddit, recorded once and replayed without network.
+
+    Requests are matched on their method, URL, params and data, identical
+    requests get their responses in the order they were recorded (the last
+    one is repeated). Access token requests are matched on their URL only so
+    a cassette can be replayed with other credentials, and the tokens
+    themselves are not saved. The x-ratelimit headers are dropped: pacing is
+    the job of RateLimiter.
+    latency is the time each replayed request takes, None to wait as long as
+    the recorded request did.
+    metadata is saved with the exchanges, for example the date of the
+    recorded report. The file is gzipped if its name ends with .gz.
+    """
+
+    def __init__(
+        self, path: str, record: bool = False, latency: Optional[float] = None
+    ):
+        self.path = Path(path)
+        self.record = record
+        self.latency = latency
+        self.metadata = {}
+        self.exchanges = []
+        self._responses = defaultdict(deque)
+        self._lock = threading.Lock()
+        if not record:
+            with self._open("rt") as f:
+                content = json.load(f)
+            self.metadata = content["metadata"]
+            self.exchanges = content["exchanges"]
+            for exchange in self.exchanges:
+                self._responses[exchange["key"]].append(exchange)
+
+    def _open(self, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(self.path, mode, encoding="utf-8")
+        return open(self.path, mode, encoding="utf-8")
+
+    @staticmethod
+    def get_key(
+        method: str, url: str, params=None, data=None, auth=None, **kwargs
+    ) -> str:
+        if auth is not None:
+            data = None
+        if isinstance(data, dict):
+            data = sorted(data.items())
+        request = [method.upper(), url, sorted((params or {}).items()), data]
+        return hashlib.sha256(
+            json.dumps(request, default=str).encode("utf-8")
+        ).hexdigest()
+
+    def add(self, method: str, url: str, kwargs: dict, response: requests.Response):
+        body = response.text
+        if "auth" in kwargs and response.ok:
+            body = json.dumps({**response.json(), "access_token": "replayed"})
+        exchange = {
+            "key": self.get_key(method, url, **kwargs),
+            "method": method.upper(),
+            "url": url,
+            "status": response.status_code,
+            "content_type": response.headers.get("content-type", ""),
+            "elapsed": response.elapsed.total_seconds(),
+            "body": body,
+        }
+        with self._lock:
+            self.exchanges.append(exchange)
+
+    def replay(self, method: str, url: str, kwargs: dict) -> requests.Response:
+        key = self.get_key(method, url, **kwargs)
+        with self._lock:
+            responses = self._responses[key]
+            if not responses:
+                raise ValueError(
+                    f"No recorded response for {method.upper()} {url} in {self.path}."
+                )
+            exchange = responses.popleft() if len(responses) > 1 else responses[0]
+        time.sleep(exchange["elapsed"] if self.latency is None else self.latency)
+        response = requests.Response()
+        response.status_code = exchange["status"]
+        response.headers["content-type"] = exchange["content_type"]
+        response._content = exchange["body"].encode("utf-8")
+        response.encoding = "utf-8"
+        response.url = url
+        response.request = requests.Request(method, url).prepare()
+        return response
+
+    def save(self):
+        with self._lock, self._open("wt") as f:
+            json.dump({"metadata": self.metadata, "exchanges": self.exchanges}, f)
+        logger.info(f"{len(self.exchanges)} requests recorded in {self.path}.")
+
+
+class BestofRequestor(prawcore.Requestor):
+    """prawcore requestor taking a token from a RateLimiter before each request.
+
+    Pass it to praw.Reddit with requestor_class so that every HTTP request,
+    including the ones expanding comment trees, share the same budget and is
+    counted in stats.
+    With a cassette, requests are either recorded in it or replayed from it
+    without reaching the network, nor taking a token.
+    """
+
+    def __init__(
+        self,
+        *args,
+        rate_limiter: RateLimiter = None,
+        stats: RequestStats = None,
+        cassette: Cassette = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.rate_limiter = rate_limiter or RateLimiter()
+        self.stats = stats or RequestStats()
+        self.cassette = cassette
+
+    def request(self, method: str, url: str, **kwargs):
+        self.stats.add_request()
+        if self.cassette and not self.cassette.record:
+            # Replayed requests don't reach Reddit, only --replay_latency slows them
+            response = self.cassette.replay(method, url, kwargs)
+        else:
+            self.rate_limiter.acquire()
+            try:
+                response = super().request(method, url, **kwargs)
+            except prawcore.RequestException as e:
+                if isinstance(e.original_exception, prawcore.Session.RETRY_EXCEPTIONS):
+                    self.stats.add_retry()
+                raise
+            if self.cassette:
+                self.cassette.add(method, url, kwargs, response)
+        self.stats.add_response(response)
+        return response
@@ -0,0 +1,232 @@
+"""Daily rollups: compact aggregates merged into weekly, monthly and yearly reports."""
+
+import logging
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import praw
+
+from . import stats, utils
+from .graph import ReplyGraph, get_reply_graph
+from .stats import Stat
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_PATH = "Rollups"
+# Number of best, worst and discussed comments kept per day
+ROLLUP_TOP = 100
+ROLLUP_TABLES = ["totals", "authors", "posts", "comments", "discussed", "pairs"]
+
+
+def get_discussed_comments(
+    df_comments: pd.DataFrame, top: int, reply_graph: ReplyGraph = None
+) -> pd.DataFrame:
+    """Comments with the most answers.
+
+    author, body and permalink are empty for the comments that are not in df_comments.
+    """
+    if reply_graph is None:
+        reply_graph = get_reply_graph(df_comments)
+    nodes = reply_graph.get_most_answered(top)
+    rows = reply_graph.rows[nodes]
+    found = rows >= 0
+    info = df_comments.iloc[rows[found]]
+    columns = {}
+    for name, values in [
+        ("author", info["author"].astype(str)),
+        ("body", info["body"]),
+        ("permalink", utils.get_permalinks(info)),
+    ]:
+        column = np.full(len(nodes), "", dtype=object)
+        column[found] = values.fillna("").to_numpy(dtype=object)
+        columns[name] = column
+    return pd.DataFrame(
+        {
+            "id": reply_graph.ids[nodes],
+            "answers": reply_graph.answers[nodes],
+            **columns,
+        }
+    )
+
+
+def get_rollup(
+    df_posts: pd.DataFrame,
+    df_comments: pd.DataFrame,
+    author_stats: pd.DataFrame = None,
+    top: int = ROLLUP_TOP,
+    reply_graph: ReplyGraph = None,
+) -> dict:
+    """Aggregates of a day that can be merged with the ones of other days.
+
+    Each comment belongs to the day of its post, so per-author sums, reply
+    counts and pair counts of several days can simply be added, and the
+    best comments of a period are among the best comments of its days.
+    """
+    if author_stats is None:
+        author_stats = utils.get_author_stats(df_comments)
+    if reply_graph is None:
+        reply_graph = get_reply_graph(df_comments)
+    authors = author_stats.join(
+        df_posts["author"].astype(str).value_counts().rename("posts"), how="outer"
+    ).fillna(0)
+    authors.index.name = "author"
+    # Back in row order, so ties are broken like on df_comments
+    comments = (
+        pd.concat(
+            [df_comments.nlargest(top, "score"), df_comments.nsmallest(top, "score")]
+        )
+        .drop_duplicates("id")
+        .sort_index()
+    )
+    comments = comments.assign(
+        author=comments["author"].astype(str),
+        permalink=utils.get_permalinks(comments),
+    )[["id", "author", "score", "body", "permalink"]]
+    return {
+        "totals": pd.DataFrame(
+            {"posts": [len(df_posts)], "comments": [len(df_comments)]}
+        ),
+        "authors": authors.astype("int64").reset_index(),
+        "posts": df_posts[
+            ["id", "author", "score", "title", "permalink", "num_comments"]
+        ].astype({"author": str}),
+        "comments": comments,
+        "discussed": get_discussed_comments(df_comments, top, reply_graph),
+        "pairs": utils.get_interactions(df_comments, None, reply_graph),
+    }
+
+
+def merge_rollups(rollups: list, top: int = ROLLUP_TOP) -> dict:
+    """Merge the rollups of several days into the rollup of the whole period."""
+    tables = {
+        x: pd.concat([r[x] for r in rollups], ignore_index=True) for x in ROLLUP_TABLES
+    }
+    discussed = tables["discussed"]
+    info = discussed[discussed.author != ""].drop_duplicates("id")
+    discussed = (
+        discussed.groupby("id", as_index=False)["answers"]
+        .sum()
+        .nlargest(top, "answers")
+        .merge(info.drop(columns="answers"), on="id", how="left")
+        .fillna("")
+    )
+    comments = tables["comments"]
+    return {
+        "totals": tables["totals"].sum().to_frame().T,
+        "authors": tables["authors"].groupby("author", as_index=False).sum(),
+        "posts": tables["posts"],
+        "comments": pd.concat(
+            [comments.nlargest(top, "score"), comments.nsmallest(top, "score")]
+        )
+        .drop_duplicates("id")
+        .sort_index(),
+        "discussed": discussed,
+        "pairs": tables["pairs"]
+        .groupby(["author1", "author2"], as_index=False)["score"]
+        .sum()
+        .sort_values(["score", "author1", "author2"], ascending=[False, True, True]),
+    }
+
+
+def save_rollup(rollup: dict, subreddit: str, day: str, path: str = ROLLUP_PATH):
+    folder = Path(path) / subreddit / day
+    folder.mkdir(parents=True, exist_ok=True)
+    for name in ROLLUP_TABLES:
+        rollup[name].to_csv(folder / f"{name}.csv.gz", index=False)
+
+
+def load_rollup(subreddit: str, day: str, path: str = ROLLUP_PATH) -> dict:
+    """Return the rollup of a day, or None if it was never saved."""
+    folder = Path(path) / subreddit / day
+    if not folder.is_dir():
+        return None
+    return {
+        name: pd.read_csv(
+            folder / f"{name}.csv.gz",
+            keep_default_na=False,
+            dtype={"id": str, "author": str, "author1": str, "author2": str},
+        )
+        for name in ROLLUP_TABLES
+    }
+
+
+def get_discussed_comment(reddit: praw.Reddit, discussed: pd.DataFrame) -> dict:
+    """Most discussed comment of a rollup, extracted separately if needed."""
+    discussed_comment = discussed.iloc[0]
+    if not discussed_comment["author"]:
+        logger.warning("Most discussed comment is not in the rollups. Extracting it.")
+        comment = reddit.comment(discussed_comment["id"])
+        comment.refresh()
+        return {
+            "discussed_comment_author": comment.author,
+            "discussed_comment_answers": discussed_comment["answers"],
+            "discussed_comment_body": utils.sanitize_long_text(comment.body),
+            "discussed_comment_link": f"https://reddit.com{comment.permalink}",
+            "discussed_comment_id": discussed_comment["id"],
+        }
+    return {
+        "discussed_comment_author": discussed_comment["author"],
+        "discussed_comment_answers": discussed_comment["answers"],
+        "discussed_comment_body": utils.sanitize_long_text(discussed_comment["body"]),
+        "discussed_comment_link": discussed_comment["permalink"],
+        "discussed_comment_id": discussed_comment["id"],
+    }
+
+
+def get_amoureux(pairs: pd.DataFrame) -> dict:
+    """Pair of users of a rollup that replied to each other the most."""
+    amoureux = pairs.iloc[0]
+    return {
+        "amoureux_author1": str(amoureux["author1"]),
+        "amoureux_author2": str(amoureux["author2"]),
+        "amoureux_score": amoureux["score"],
+    }
+
+
+def get_author_stats(authors: pd.DataFrame) -> pd.DataFrame:
+    """Aggregates of the authors of a rollup that commented, by author."""
+    authors = authors.set_index("author")
+    return authors[authors.comments > 0]
+
+
+# Inputs derived from the tables of a rollup
+ROLLUP_INPUTS = {"author_stats": Stat(get_author_stats, [], ["authors"])}
+# Same stats as stats.STATS, from the tables of a rollup
+ROLLUP_STATS = [
+    Stat(utils.get_best_post, stats.BEST_POST_KEYS, ["posts"]),
+    Stat(utils.get_commented_post, stats.COMMENTED_POST_KEYS, ["posts"]),
+    Stat(utils.get_best_comment, stats.BEST_COMMENT_KEYS, ["comments"]),
+    Stat(utils.get_worst_comment, stats.WORST_COMMENT_KEYS, ["comments"]),
+    Stat(get_discussed_comment, stats.DISCUSSED_COMMENT_KEYS, ["reddit", "discussed"]),
+    Stat(get_amoureux, stats.AMOUREUX_KEYS, ["pairs"]),
+    *stats.AUTHOR_STATS,
+]
+
+
+def get_env_rollup(
+    reddit: praw.Reddit,
+    rollup: dict,
+    formatted_date: str,
+    subreddit: str,
+    keys: Optional[set] = None,
+) -> dict:
+    """Create the same stats as get_env_post from a (merged) rollup.
+
+    Only the stats setting one of keys are computed, all of them if None.
+    """
+    return {
+        "date": formatted_date,
+        "subreddit": subreddit,
+        "number_total_posts": rollup["totals"]["posts"].iloc[0],
+        "number_total_comments": rollup["totals"]["comments"].iloc[0],
+        "number_unique_users": len(rollup["authors"]),
+        **stats.compute_stats(
+            ROLLUP_STATS,
+            ROLLUP_INPUTS,
+            # The author stats don't need the comments
+            {"reddit": reddit, "df_comments": None, **rollup},
+            keys,
+        ),
+    }
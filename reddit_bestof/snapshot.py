@@ -0,0 +1,104 @@
+"""Parquet snapshots of the posts and comments of each day.
+
+Snapshots are partitioned by subreddit and date:
+Snapshots/comments/subreddit=france/date=2021-11-02/part-0.parquet
+The permalinks of comments are always written, even for frames that only
+keep the permalink of their post.
+pyarrow is only needed to write or read snapshots.
+"""
+
+import logging
+from pathlib import Path
+
+import pandas as pd
+
+from . import utils
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PATH = "Snapshots"
+
+
+def get_schemas() -> dict:
+    import pyarrow as pa
+
+    author = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "posts": pa.schema(
+            [
+                ("id", pa.string()),
+                ("score", pa.int32()),
+                ("author", author),
+                ("permalink", pa.string()),
+                ("title", pa.string()),
+                ("timestamp", pa.int64()),
+                ("num_comments", pa.int32()),
+            ]
+        ),
+        "comments": pa.schema(
+            [
+                ("id", pa.string()),
+                ("score", pa.int32()),
+                ("author", author),
+                ("permalink", pa.string()),
+                ("body", pa.string()),
+                ("parent", pa.string()),
+                ("length", pa.int32()),
+                ("timestamp", pa.int64()),
+            ]
+        ),
+    }
+
+
+def save_snapshot(
+    df_posts: pd.DataFrame,
+    df_comments: pd.DataFrame,
+    subreddit: str,
+    day: str,
+    path: str = SNAPSHOT_PATH,
+):
+    """Write the posts and comments of a day, replacing a previous snapshot."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schemas = get_schemas()
+    for name, df in [("posts", df_posts), ("comments", df_comments)]:
+        folder = Path(path) / name / f"subreddit={subreddit}" / f"date={day}"
+        folder.mkdir(parents=True, exist_ok=True)
+        if name == "comments":
+            df = df.assign(permalink=utils.get_permalinks(df))
+        table = pa.Table.from_pandas(
+            df.reindex(columns=schemas[name].names),
+            schema=schemas[name],
+            preserve_index=False,
+        )
+        pq.write_table(table, folder / "part-0.parquet", compression="zstd")
+    logger.info(f"Snapshot of /r/{subreddit} for {day} saved in {path}.")
+
+
+def load_snapshot(
+    name: str,
+    subreddit: str = None,
+    days: list = None,
+    columns: list = None,
+    path: str = SNAPSHOT_PATH,
+) -> pd.DataFrame:
+    """Read the posts or comments of some days, optionally only some columns.
+
+    Only the matching partitions are read, with memory-mapped files.
+    """
+    import pyarrow.parquet as pq
+
+    filters = []
+    if subreddit:
+        filters.append(("subreddit", "=", subreddit))
+    if days:
+        filters.append(("date", "in", days))
+    table = pq.read_table(
+        Path(path) / name,
+        columns=columns,
+        filters=filters or None,
+        memory_map=True,
+        partitioning="hive",
+    )
+    return table.to_pandas()
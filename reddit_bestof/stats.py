@@ -0,0 +1,147 @@
+"""Registry of the stats of a report and the inputs they share.
+
+Each stat declares the keys it sets in env_post and the inputs it is called
+with. Inputs are either given (the frames, the Reddit session) or derived
+from other inputs, like the per-author aggregates or the reply graph: a derived
+input is computed once for all the stats needing it. A new award only needs
+a Stat in STATS, and a new shared input an entry in INPUTS.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+from . import graph, utils
+from .metrics import Metrics
+
+
+class Stat:
+    """A function called with inputs, returning some keys of env_post."""
+
+    def __init__(self, function: Callable, keys: list, inputs: list):
+        self.function = function
+        self.name = function.__name__
+        self.keys = keys
+        self.inputs = inputs
+
+    def is_needed(self, keys: Optional[set]) -> bool:
+        """Whether the stat sets one of keys (all stats are needed if None)."""
+        return keys is None or not keys.isdisjoint(self.keys)
+
+
+def get_keys(prefix: str, names: list) -> list:
+    return [f"{prefix}_{x}" for x in names]
+
+
+BEST_POST_KEYS = get_keys("best_post", ["author", "score", "title", "link", "id"])
+COMMENTED_POST_KEYS = get_keys(
+    "commented_post", ["author", "comments", "title", "link", "id"]
+)
+BEST_COMMENT_KEYS = get_keys("best_comment", ["author", "score", "body", "link", "id"])
+WORST_COMMENT_KEYS = get_keys(
+    "worst_comment", ["author", "score", "body", "link", "id"]
+)
+DISCUSSED_COMMENT_KEYS = get_keys(
+    "discussed_comment", ["author", "answers", "body", "link", "id"]
+)
+AMOUREUX_KEYS = get_keys("amoureux", ["author1", "author2", "score"])
+# Awards computed from the per-author aggregates
+AUTHOR_STATS = [
+    Stat(
+        function, get_keys(prefix, ["author", "score"]), ["df_comments", "author_stats"]
+    )
+    for function, prefix in [
+        (utils.get_qualite, "qualite"),
+        (utils.get_poc, "poc"),
+        (utils.get_tartine, "tartine"),
+        (utils.get_capslock, "capslock"),
+        (utils.get_indecision, "indecision"),
+        (utils.get_jackpot, "jackpot"),
+        (utils.get_krach, "krach"),
+    ]
+]
+
+# Inputs derived from df_comments
+INPUTS = {
+    "author_stats": Stat(utils.get_author_stats, [], ["df_comments"]),
+    "reply_graph": Stat(graph.get_reply_graph, [], ["df_comments"]),
+}
+# Stats of get_env_post, in the order of env_post
+STATS = [
+    Stat(utils.get_best_post, BEST_POST_KEYS, ["df_posts"]),
+    Stat(utils.get_commented_post, COMMENTED_POST_KEYS, ["df_posts"]),
+    Stat(utils.get_best_comment, BEST_COMMENT_KEYS, ["df_comments"]),
+    Stat(utils.get_worst_comment, WORST_COMMENT_KEYS, ["df_comments"]),
+    Stat(
+        utils.get_discussed_comment,
+        DISCUSSED_COMMENT_KEYS,
+        ["reddit", "df_comments", "reply_graph"],
+    ),
+    Stat(utils.get_amoureux, AMOUREUX_KEYS, ["df_comments", "reply_graph"]),
+    *AUTHOR_STATS,
+]
+
+
+def compute_stats(
+    stats: list,
+    inputs: dict,
+    values: dict,
+    keys: Optional[set] = None,
+    metrics: Metrics = None,
+    workers: int = 1,
+) -> dict:
+    """Compute the stats setting one of keys (all of them if None).
+
+    values are the given inputs, inputs the derived ones that are only
+    computed if a needed stat uses them. Each function is measured in
+    metrics. With workers > 1, derived inputs and stats are computed by a
+    thread pool as soon as their inputs are ready.
+    Return the keys set by the stats, in the order of stats.
+    """
+    metrics = metrics or Metrics()
+    values = dict(values)
+    tasks = {x.name: x for x in stats if x.is_needed(keys)}
+    missing = [name for task in tasks.values() for name in task.inputs]
+    while missing:
+        name = missing.pop()
+        if name not in values and name not in tasks:
+            if name not in inputs:
+                raise ValueError(f"Input {name} is missing.")
+            tasks[name] = inputs[name]
+            missing.extend(inputs[name].inputs)
+
+    results = {}
+    running = {}
+    executor = ThreadPoolExecutor(workers) if workers > 1 else None
+
+    def add_result(name: str, result):
+        results[name] = result
+        if name in inputs:
+            values[name] = result
+
+    try:
+        while tasks or running:
+            ready = [
+                name
+                for name, task in tasks.items()
+                if all(x in values for x in task.inputs)
+            ]
+            for name in ready:
+                task = tasks.pop(name)
+                args = [values[x] for x in task.inputs]
+                if executor:
+                    future = executor.submit(metrics.call, task.function, *args)
+                    running[future] = name
+                else:
+                    add_result(name, metrics.call(task.function, *args))
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    add_result(running.pop(future), future.result())
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+    env = {}
+    for stat in stats:
+        if stat.name in results:
+            env.update(results[stat.name])
+    return env
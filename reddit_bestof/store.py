@@ -0,0 +1,216 @@
+"""Local SQLite store of the posts and comments extracted from Reddit."""
+
+import logging
+import sqlite3
+import threading
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+POST_COLUMNS = [
+    "id",
+    "score",
+    "author",
+    "permalink",
+    "title",
+    "timestamp",
+    "num_comments",
+]
+COMMENT_COLUMNS = [
+    "id",
+    "score",
+    "author",
+    "permalink",
+    "body",
+    "parent",
+    "length",
+    "timestamp",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    subreddit TEXT NOT NULL,
+    score INTEGER,
+    author TEXT,
+    permalink TEXT,
+    title TEXT,
+    timestamp INTEGER,
+    num_comments INTEGER
+);
+CREATE INDEX IF NOT EXISTS posts_subreddit_timestamp ON posts (subreddit, timestamp);
+CREATE TABLE IF NOT EXISTS comments (
+    id TEXT PRIMARY KEY,
+    post_id TEXT NOT NULL,
+    position INTEGER,
+    score INTEGER,
+    author TEXT,
+    permalink TEXT,
+    body TEXT,
+    parent TEXT,
+    length INTEGER,
+    timestamp INTEGER
+);
+CREATE INDEX IF NOT EXISTS comments_post_id ON comments (post_id, position);
+CREATE TABLE IF NOT EXISTS state (
+    subreddit TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value INTEGER,
+    PRIMARY KEY (subreddit, key)
+);
+"""
+
+
+class Store:
+    """Posts and comments keyed by their Reddit id.
+
+    Rows have the same keys as the ones built by get_data, comments also
+    remember the post they belong to so a post can be reused as a whole.
+    The connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._connection.close()
+
+    def get_post(self, post_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {', '.join(POST_COLUMNS)} FROM posts WHERE id = ?",
+                (post_id,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def has_comment(self, comment_id: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT 1 FROM comments WHERE id = ?", (comment_id,)
+            ).fetchone()
+        return row is not None
+
+    def get_comments(self, post_id: str) -> list:
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {', '.join(COMMENT_COLUMNS)} FROM comments WHERE post_id = ? ORDER BY position",
+                (post_id,),
+            ).fetchall()
+        return [dict(x) for x in rows]
+
+    def save_submission(self, subreddit: str, post: dict, comments: list = None):
+        """Insert or replace a post and, if given, all its comments."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"INSERT OR REPLACE INTO posts (subreddit, {', '.join(POST_COLUMNS)}) "
+                f"VALUES (?, {', '.join('?' * len(POST_COLUMNS))})",
+                [subreddit] + [post[x] for x in POST_COLUMNS],
+            )
+            if comments is None:
+                return
+            self._connection.execute(
+                "DELETE FROM comments WHERE post_id = ?", (post["id"],)
+            )
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO comments (post_id, position, {', '.join(COMMENT_COLUMNS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(COMMENT_COLUMNS))})",
+                [
+                    [post["id"], position] + [comment[x] for x in COMMENT_COLUMNS]
+                    for position, comment in enumerate(comments)
+                ],
+            )
+
+    def save_comments(self, post_id: str, comments: list):
+        """Insert or replace comments of a post, keeping the others.
+
+        New comments are added after the ones already saved for the post.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                f"INSERT OR REPLACE INTO comments (post_id, position, {', '.join(COMMENT_COLUMNS)}) "
+                "VALUES (?, COALESCE((SELECT position FROM comments WHERE id = ?), "
+                "(SELECT COUNT(*) FROM comments WHERE post_id = ?)), "
+                f"{', '.join('?' * len(COMMENT_COLUMNS))})",
+                [
+                    [post_id, comment["id"], post_id]
+                    + [comment[x] for x in COMMENT_COLUMNS]
+                    for comment in comments
+                ],
+            )
+
+    def get_state(self, subreddit: str, key: str) -> Optional[int]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value FROM state WHERE subreddit = ? AND key = ?",
+                (subreddit, key),
+            ).fetchone()
+        return row["value"] if row else None
+
+    def set_state(self, subreddit: str, key: str, value: int):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO state (subreddit, key, value) VALUES (?, ?, ?)",
+                (subreddit, key, value),
+            )
+
+    def get_ids(
+        self, subreddit: str, min_timestamp: int, max_timestamp: int
+    ) -> Tuple[list, list]:
+        """Return the ids of the stored posts created in the window and of their comments."""
+        with self._lock:
+            post_ids = self._connection.execute(
+                "SELECT id FROM posts WHERE subreddit = ? AND timestamp BETWEEN ? AND ?",
+                (subreddit, min_timestamp, max_timestamp),
+            ).fetchall()
+            comment_ids = self._connection.execute(
+                "SELECT c.id FROM comments c JOIN posts p ON c.post_id = p.id "
+                "WHERE p.subreddit = ? AND p.timestamp BETWEEN ? AND ?",
+                (subreddit, min_timestamp, max_timestamp),
+            ).fetchall()
+        return [x["id"] for x in post_ids], [x["id"] for x in comment_ids]
+
+    def update_scores(self, posts: list, comments: list):
+        """Update scores in place.
+
+        posts is a list of (id, score, num_comments), comments a list of (id, score).
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE posts SET score = ?, num_comments = ? WHERE id = ?",
+                [(score, num_comments, i) for i, score, num_comments in posts],
+            )
+            self._connection.executemany(
+                "UPDATE comments SET score = ? WHERE id = ?",
+                [(score, i) for i, score in comments],
+            )
+
+    def load_data(
+        self, subreddit: str, min_timestamp: int, max_timestamp: int
+    ) -> Tuple[list, list]:
+        """Return the stored posts created in the window and their comments."""
+        with self._lock:
+            posts = self._connection.execute(
+                f"SELECT {', '.join(POST_COLUMNS)} FROM posts "
+                "WHERE subreddit = ? AND timestamp BETWEEN ? AND ? "
+                "ORDER BY timestamp DESC",
+                (subreddit, min_timestamp, max_timestamp),
+            ).fetchall()
+            comments = self._connection.execute(
+                f"SELECT {', '.join('c.' + x for x in COMMENT_COLUMNS)} "
+                "FROM comments c JOIN posts p ON c.post_id = p.id "
+                "WHERE p.subreddit = ? AND p.timestamp BETWEEN ? AND ? "
+                "ORDER BY p.timestamp DESC, c.position",
+                (subreddit, min_timestamp, max_timestamp),
+            ).fetchall()
+        return [dict(x) for x in posts], [dict(x) for x in comments]
@@ -0,0 +1,181 @@
+"""Stats kept up to date as posts and comments are extracted, without frames."""
+
+import heapq
+from collections import Counter
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+import praw
+
+from . import rollup, utils
+from .frames import FEATURES_CHUNK_SIZE
+
+AUTHOR_COLUMNS = ["score", "length", "comments", "capslock", "question", "posts"]
+
+
+class StreamingStats:
+    """Rollup of a day folded from the post and comment rows as they come.
+
+    Only per-author sums, reply counts per pair of authors, the posts and the
+    top comments of the rollup are kept, so memory grows with the number of
+    authors and posts rather than with the number of comments. get_rollup
+    returns the same tables as rollup.get_rollup and get_env_post the same
+    stats as the frames, at any time of the extraction.
+
+    Like with FramesBuilder(keep_bodies=False), each call to add_comments
+    must contain all the replies of its comments, as the comments of a post
+    do.
+    """
+
+    def __init__(self, top: int = rollup.ROLLUP_TOP):
+        self.top = top
+        self.posts = []
+        self.comments = 0
+        self.authors = {}
+        self.pairs = Counter()
+        # (score, -position, row) heaps of the best and worst comments
+        self.best = []
+        self.worst = []
+        # (answers, -position of the first answer, id, row) heap
+        self.discussed = []
+        self.pending = []
+
+    def get_author(self, author: str) -> list:
+        values = self.authors.get(author)
+        if values is None:
+            values = self.authors[author] = [0] * len(AUTHOR_COLUMNS)
+        return values
+
+    def add_post(self, post: dict):
+        self.posts.append(
+            {
+                "id": post["id"],
+                "author": post["author"],
+                "score": post["score"],
+                "title": post["title"],
+                "permalink": post["permalink"],
+                "num_comments": post["num_comments"],
+            }
+        )
+        self.get_author(post["author"])[5] += 1
+
+    def push(self, heap: list, item: tuple):
+        """Keep the top items of heap."""
+        if len(heap) < self.top:
+            heapq.heappush(heap, item)
+        elif item > heap[0]:
+            heapq.heapreplace(heap, item)
+
+    def add_comments(self, comments: list):
+        replies = {}
+        answers = Counter()
+        first_answers = {}
+        for position, comment in enumerate(comments, self.comments):
+            author = self.get_author(comment["author"])
+            author[0] += comment["score"]
+            author[1] += comment["length"]
+            author[2] += 1
+            self.pending.append((comment["author"], comment["body"]))
+            row = {
+                "id": comment["id"],
+                "author": comment["author"],
+                "score": comment["score"],
+                "body": comment["body"],
+                "permalink": comment["permalink"],
+            }
+            self.push(self.best, (comment["score"], -position, row))
+            self.push(self.worst, (-comment["score"], -position, row))
+            if comment["parent"].startswith("t1_"):
+                parent = comment["parent"][3:]
+                replies.setdefault(comment["id"], comment["author"])
+                answers[parent] += 1
+                first_answers.setdefault(parent, position)
+        self.comments += len(comments)
+
+        rows = {x["id"]: x for x in reversed(comments)}
+        for parent, count in answers.items():
+            row = rows.get(parent)
+            info = {
+                "author": row["author"] if row else "",
+                "body": row["body"] if row else "",
+                "permalink": row["permalink"] if row else "",
+            }
+            self.push(self.discussed, (count, -first_answers[parent], parent, info))
+        # Pairs of authors of a reply and of the reply it answers
+        for comment in comments:
+            if not comment["parent"].startswith("t1_"):
+                continue
+            replied = replies.get(comment["parent"][3:])
+            if replied is not None and replied != comment["author"]:
+                self.pairs[tuple(sorted([replied, comment["author"]]))] += 1
+        if len(self.pending) >= FEATURES_CHUNK_SIZE:
+            self.add_features()
+
+    def add_features(self):
+        """Add the capslock characters and questions of the pending comments."""
+        if not self.pending:
+            return
+        authors, bodies = zip(*self.pending)
+        body = pd.Series(bodies, dtype=str)
+        for author, capslock, question in zip(
+            authors,
+            utils.count_capslock(body).tolist(),
+            utils.count_questions(body).tolist(),
+        ):
+            values = self.authors[author]
+            values[3] += capslock
+            values[4] += question
+        self.pending = []
+
+    def get_rollup(self) -> dict:
+        """Same tables as rollup.get_rollup on the rows added so far."""
+        self.add_features()
+        authors = sorted(self.authors)
+        best = sorted(self.best, reverse=True)
+        best_ids = {x[2]["id"] for x in best}
+        worst = [
+            x for x in sorted(self.worst, reverse=True) if x[2]["id"] not in best_ids
+        ]
+        discussed = sorted(self.discussed, reverse=True)
+        pairs = sorted(self.pairs.items(), key=lambda x: (-x[1], x[0]))
+        return {
+            "totals": pd.DataFrame(
+                {"posts": [len(self.posts)], "comments": [self.comments]}
+            ),
+            "authors": pd.DataFrame(
+                np.array([self.authors[x] for x in authors], dtype="int64").reshape(
+                    -1, len(AUTHOR_COLUMNS)
+                ),
+                columns=AUTHOR_COLUMNS,
+            ).assign(author=authors)[["author", *AUTHOR_COLUMNS]],
+            "posts": pd.DataFrame(
+                self.posts,
+                columns=["id", "author", "score", "title", "permalink", "num_comments"],
+            ),
+            "comments": pd.DataFrame(
+                # In row order, like rollup.get_rollup
+                [x[2] for x in sorted(best + worst, key=lambda x: -x[1])],
+                columns=["id", "author", "score", "body", "permalink"],
+            ),
+            "discussed": pd.DataFrame(
+                [{"id": x[2], "answers": x[0], **x[3]} for x in discussed],
+                columns=["id", "answers", "author", "body", "permalink"],
+            ),
+            "pairs": pd.DataFrame(
+                [(*authors, score) for authors, score in pairs],
+                columns=["author1", "author2", "score"],
+            ),
+        }
+
+    def get_env_post(
+        self,
+        reddit: praw.Reddit,
+        formatted_date: str,
+        subreddit: str,
+        keys: Optional[set] = None,
+    ) -> dict:
+        """Same stats as get_env_post on the rows added so far."""
+        return rollup.get_env_rollup(
+            reddit, self.get_rollup(), formatted_date, subreddit, keys
+        )
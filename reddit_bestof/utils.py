@@ -1,12 +1,21 @@
 import logging
 import re
 import string
-from collections import Counter
+from typing import Optional
 
+import numpy as np
 import pandas as pd
 import praw
 
+from .graph import ReplyGraph, get_reply_graph
+
 logger = logging.getLogger(__name__)
+PUNCTUATION_PATTERN = re.compile(f"[{re.escape(string.punctuation)}]")
+LAST_QUESTION_PATTERN = re.compile(r"^(.*\?)", re.DOTALL)
+# Punctuation is not part of words: "_" doesn't count as an alphanumerical character
+QUESTION_PATTERN = re.compile(r"(?:[^?\w]|_)*[^\W_][^?]*\?")
+# A comment permalink is the permalink of its post followed by its id and this
+COMMENT_LINK_END = "/?context=2"
 
 
 def sanitize_comment_body(body: str) -> str:
@@ -50,6 +59,26 @@ def sanitize_link(link: str) -> str:
     return f"https://reddit.com{link}?context=2"
 
 
+def get_permalinks(df_comments: pd.DataFrame) -> pd.Series:
+    """Permalinks of comments.
+
+    Frames built by frames.FramesBuilder only keep the permalink of the post
+    of each comment, the permalink of a comment is rebuilt from it.
+    """
+    if "permalink" in df_comments:
+        return df_comments["permalink"]
+    return (
+        df_comments["post_permalink"].astype(str) + df_comments["id"] + COMMENT_LINK_END
+    )
+
+
+def get_permalink(comment: pd.Series) -> str:
+    """Permalink of a comment row, see get_permalinks."""
+    if "permalink" in comment:
+        return comment["permalink"]
+    return comment["post_permalink"] + comment["id"] + COMMENT_LINK_END
+
+
 def get_best_post(df_posts: pd.DataFrame) -> dict[str, str]:
     """Post with the best score."""
     best_post = df_posts.loc[df_posts["score"].idxmax()]
@@ -85,7 +114,7 @@ def get_best_comment(df_comments: pd.DataFrame) -> dict[str, str]:
         "best_comment_author": best_comment["author"],
         "best_comment_score": best_comment["score"],
         "best_comment_body": sanitize_long_text(best_comment["body"]),
-        "best_comment_link": best_comment["permalink"],
+        "best_comment_link": get_permalink(best_comment),
         "best_comment_id": best_comment["id"],
     }
 
@@ -97,33 +126,36 @@ def get_worst_comment(df_comments: pd.DataFrame) -> dict[str, str]:
         "worst_comment_author": worst_comment["author"],
         "worst_comment_score": worst_comment["score"],
         "worst_comment_body": sanitize_long_text(worst_comment["body"]),
-        "worst_comment_link": worst_comment["permalink"],
+        "worst_comment_link": get_permalink(worst_comment),
         "worst_comment_id": worst_comment["id"],
     }
 
 
 def get_discussed_comment(
-    reddit: praw.Reddit, df_comments: pd.DataFrame
+    reddit: praw.Reddit, df_comments: pd.DataFrame, reply_graph: ReplyGraph = None
 ) -> dict[str, str]:
     """Comment with the most answers.
 
     The most discussed comment might not be in df_comments
     so we extract it separately.
     """
-    subset = df_comments[df_comments.parent.str.startswith("t1_")][
-        "parent"
-    ].value_counts()
-    discussed_comment_answers = subset.iloc[0]
-    discussed_parent_id = subset.idxmax().split("_")[-1]
-    discussed_comment = df_comments[df_comments["id"] == discussed_parent_id]
-    if not discussed_comment.empty:
+    if reply_graph is None:
+        reply_graph = get_reply_graph(df_comments)
+    node = reply_graph.get_most_answered(1)[0]
+    discussed_comment_answers = reply_graph.answers[node]
+    discussed_parent_id = reply_graph.ids[node]
+    row = reply_graph.rows[node]
+    if row >= 0:
+        discussed_comment = df_comments.iloc[[row]]
         return {
-            "discussed_comment_author": discussed_comment.author.to_string(index=False),
+            "discussed_comment_author": discussed_comment.author.astype(str).to_string(
+                index=False
+            ),
             "discussed_comment_answers": discussed_comment_answers,
             "discussed_comment_body": sanitize_long_text(
                 discussed_comment.body.to_string(index=False)
             ),
-            "discussed_comment_link": discussed_comment.permalink.to_string(
+            "discussed_comment_link": get_permalinks(discussed_comment).to_string(
                 index=False
             ),
             "discussed_comment_id": discussed_comment.id.to_string(index=False),
@@ -143,130 +175,226 @@ def get_discussed_comment(
         }
 
 
-def get_amoureux(df_comments: pd.DataFrame) -> dict[str, str]:
-    """Two users that interacted with each other the most."""
-    # filter comments answering to another comment
-    subset = df_comments[df_comments.parent.str.startswith("t1_")]
-    subset = subset.copy()
-    subset.loc[:, "parent_id"] = subset.parent.str.split("_").str[-1]
-    subset2 = subset.set_index("id").join(subset.set_index("parent_id"), rsuffix="_new")
-    subset3 = (
-        subset2[subset2.author_new.notnull()][["author", "author_new"]]
-        .apply(Counter, axis="columns")
-        .value_counts()
+def get_interactions(
+    df_comments: pd.DataFrame,
+    top: Optional[int] = 10,
+    reply_graph: ReplyGraph = None,
+) -> pd.DataFrame:
+    """Pairs of users that replied to each other the most.
+
+    Only the replies to comments that are themselves replies are counted.
+    Authors are integer-coded and each reply becomes the key of its unordered
+    pair of authors, counted with a hash-based value_counts. Self-replies are
+    skipped. Ties are ordered by author.
+    Return the top pairs (all of them if top is None) with the columns
+    author1, author2 and score.
+    """
+    if reply_graph is None:
+        reply_graph = get_reply_graph(df_comments)
+    replies, replied = reply_graph.get_reply_pairs()
+    codes, authors = pd.factorize(df_comments["author"].astype(str), sort=True)
+    replier = codes[replies].astype("int64")
+    replied = codes[replied].astype("int64")
+    not_self = replier != replied
+    keys = (
+        np.minimum(replier, replied)[not_self] * len(authors)
+        + np.maximum(replier, replied)[not_self]
+    )
+    counts = (
+        pd.Series(keys)
+        .value_counts(sort=False)
+        .sort_index()
+        .sort_values(ascending=False, kind="stable")
+    )
+    if top is not None:
+        counts = counts.head(top)
+    return pd.DataFrame(
+        {
+            "author1": authors[counts.index // len(authors)],
+            "author2": authors[counts.index % len(authors)],
+            "score": counts.to_numpy(),
+        }
     )
-    score = subset3.iloc[0]
-    authors = [x for x, y in subset3.index[0].items()]
+
+
+def get_amoureux(
+    df_comments: pd.DataFrame, reply_graph: ReplyGraph = None
+) -> dict[str, str]:
+    """Two users that interacted with each other the most."""
+    amoureux = get_interactions(df_comments, top=1, reply_graph=reply_graph).iloc[0]
     return {
-        "amoureux_author1": str(authors[0]),
-        "amoureux_author2": str(authors[1]),
-        "amoureux_score": score,
+        "amoureux_author1": str(amoureux["author1"]),
+        "amoureux_author2": str(amoureux["author2"]),
+        "amoureux_score": amoureux["score"],
     }
 
 
-def get_qualite(df_comments: pd.DataFrame) -> dict[str, str]:
+def count_capslock(body: pd.Series) -> pd.Series:
+    """Number of characters in full uppercase words of each comment."""
+    # replace punctuation with space so they don't count as characters in words
+    body2 = body.str.replace(PUNCTUATION_PATTERN, " ", regex=True)
+    return pd.Series(
+        np.fromiter(
+            (sum([len(x) for x in row.split() if x.isupper()]) for row in body2),
+            dtype="int64",
+            count=len(body2),
+        ),
+        index=body.index,
+    )
+
+
+def count_questions(body: pd.Series) -> pd.Series:
+    """Number of questions in each comment.
+
+    A question is defined as a string containing at least
+    one alphanumerical character and ending with at least one question mark.
+    """
+    # the text after the last question mark can't contain a question.
+    # object Series use Python re: \w of Arrow-backed str Series only matches ASCII
+    questions = (
+        body.astype(object).str.extract(LAST_QUESTION_PATTERN, expand=False).fillna("")
+    )
+    return questions.str.count(QUESTION_PATTERN).astype("int64")
+
+
+def get_author_stats(df_comments: pd.DataFrame) -> pd.DataFrame:
+    """Numeric aggregates per author, shared by all the user stats.
+
+    Columns: score, length, comments, capslock, question.
+    Only numeric columns are summed, so the text columns are never concatenated.
+    The text features are read from the capslock and question columns if
+    they were computed when the frame was built.
+    """
+    if "length" in df_comments:
+        length = df_comments["length"]
+    else:
+        length = df_comments["body"].str.len()
+    features = pd.DataFrame(
+        {
+            "author": df_comments["author"],
+            "score": df_comments["score"],
+            "length": length,
+            "capslock": (
+                df_comments["capslock"]
+                if "capslock" in df_comments
+                else count_capslock(df_comments["body"])
+            ),
+            "question": (
+                df_comments["question"]
+                if "question" in df_comments
+                else count_questions(df_comments["body"])
+            ),
+        }
+    )
+    # Authors of the categories that didn't comment are not kept
+    return features.groupby("author", observed=True).agg(
+        score=("score", "sum"),
+        length=("length", "sum"),
+        comments=("score", "size"),
+        capslock=("capslock", "sum"),
+        question=("question", "sum"),
+    )
+
+
+def get_qualite(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
     """From : https://www.reddit.com/r/BestOfFrance/wiki/index
 
     Le prix qualité récompense le participant qui a le meilleur rapport "karma par caractère tapés".
     Pour prétendre à ce titre, il faut avoir contribué au moins 140 caractères dans la journée.
     Le score est mesuré en milliSPHKS en l'honneur de /u/sphks qui a suggéré cette fonctionnalité (1 SPHKS = 1 point de karma par caractère).
     """
-    subset = df_comments.groupby(["author"]).sum()
-    subset2 = subset[subset.length > 140].copy()
-    subset2.loc[:, "milliSPHKS"] = subset2["score"] / subset2["length"] * 1000
-    qualite_author = subset2.loc[subset2["milliSPHKS"].idxmax()]
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats[author_stats.length > 140].copy()
+    subset.loc[:, "milliSPHKS"] = subset["score"] / subset["length"] * 1000
+    qualite_author = subset.loc[subset["milliSPHKS"].idxmax()]
     return {
         "qualite_author": qualite_author.name,
         "qualite_score": round(qualite_author["milliSPHKS"], 2),
     }
 
 
-def get_poc(df_comments: pd.DataFrame) -> dict[str, str]:
-    """User that posted the most comments."""
-    poc = df_comments["author"].value_counts()
+def get_poc(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
+    """User that posted the most comments.
+
+    Ties go to the first author in alphabetical order, like the other author
+    stats, so that the reports created from rollups agree.
+    """
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    poc = author_stats["comments"]
     return {
         "poc_author": str(poc.idxmax()),
-        "poc_score": poc.iloc[0],
+        "poc_score": poc[poc.idxmax()],
     }
 
 
-def get_tartine(df_comments: pd.DataFrame) -> dict[str, str]:
+def get_tartine(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
     """User that typed the most characters."""
-    subset = df_comments.groupby(["author"]).sum()["length"]
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats["length"]
     return {
         "tartine_author": str(subset.idxmax()),
         "tartine_score": subset[subset.idxmax()],
     }
 
 
-def get_capslock(df_comments: pd.DataFrame) -> dict[str, str]:
+def get_capslock(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
     """User that typed the most uppercase characters.
 
     Only the characters from full uppercase words are taken into account.
     """
-    subset = df_comments
-    # replace punctuation with space so they don't count as characters in words
-    subset["body2"] = subset["body"].str.replace(
-        f"[{string.punctuation}]", " ", regex=True
-    )
-    subset["capslock"] = subset["body2"].apply(
-        lambda row: sum([len(x) for x in row.split() if x.isupper()])
-    )
-    subset2 = subset.groupby("author").sum()["capslock"]
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats["capslock"]
     return {
-        "capslock_author": str(subset2.idxmax()),
-        "capslock_score": subset2[subset2.idxmax()],
+        "capslock_author": str(subset.idxmax()),
+        "capslock_score": subset[subset.idxmax()],
     }
 
 
-def get_indecision(df_comments: pd.DataFrame) -> dict[str, str]:
-    """User that asked the most questions.
-
-    A question is defined as a string containing at least
-    one alphanumerical character and ending with at least one question mark.
-    """
-    subset = df_comments
-    # delete all non-question marks characters and remove repeated question marks
-    subset["body2"] = (
-        subset["body"]
-        .str.replace(
-            "[{}]".format(string.punctuation.replace("?", "")), ".", regex=True
-        )
-        .str.replace(r"\?+", "?", regex=True)
-        .str.replace(r"\.+", ".", regex=True)
-    )
-    subset["question"] = subset["body2"].apply(
-        lambda row: (
-            len(
-                [
-                    x
-                    for x in row.rsplit("?", 1)[0].split("?")
-                    if (x and bool(re.search(r"\w", x)))
-                ]
-            )
-            if "?" in row
-            else 0
-        )
-    )
-    subset2 = subset.groupby("author").sum()["question"]
+def get_indecision(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
+    """User that asked the most questions."""
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats["question"]
     return {
-        "indecision_author": str(subset2.idxmax()),
-        "indecision_score": subset2[subset2.idxmax()],
+        "indecision_author": str(subset.idxmax()),
+        "indecision_score": subset[subset.idxmax()],
     }
 
 
-def get_jackpot(df_comments: pd.DataFrame) -> dict[str, str]:
+def get_jackpot(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
     """User that gained the most karma."""
-    subset = df_comments.groupby(["author"]).sum()["score"]
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats["score"]
     return {
         "jackpot_author": str(subset.idxmax()),
         "jackpot_score": subset[subset.idxmax()],
     }
 
 
-def get_krach(df_comments: pd.DataFrame) -> dict[str, str]:
+def get_krach(
+    df_comments: pd.DataFrame, author_stats: pd.DataFrame = None
+) -> dict[str, str]:
     """User that lost the most karma."""
-    subset = df_comments.groupby(["author"]).sum()["score"]
+    if author_stats is None:
+        author_stats = get_author_stats(df_comments)
+    subset = author_stats["score"]
     return {
         "krach_author": str(subset.idxmin()),
         "krach_score": subset[subset.idxmin()],
@@ -22,4 +22,5 @@ setuptools.setup(
         "Operating System :: POSIX :: Linux",
     ],
     install_requires=["requests", "pandas", "praw", "tqdm"],
+    extras_require={"parquet": ["pyarrow"], "archive": ["zstandard"]},
 )
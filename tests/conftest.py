@@ -1,6 +1,7 @@
 import numpy as np
 import pandas as pd
 import pytest
+from praw.models import MoreComments
 
 
 @pytest.fixture
@@ -223,3 +224,158 @@ def test_indecision_comments_dataframe():
     data["score"] = pd.to_numeric(data["score"])
     data["length"] = data["body"].str.len()
     yield data
+
+
+class FakeComment:
+    def __init__(self, id, author, score, body, parent_id, created_utc, link_id=None):
+        self.id = id
+        self.link_id = link_id
+        self.author = author
+        self.score = score
+        self.body = body
+        self.parent_id = parent_id
+        self.created_utc = created_utc
+        self.permalink = f"/r/test/comments/{parent_id}/_/{id}/"
+        self.fullname = f"t1_{id}"
+
+
+class FakeMoreComments(MoreComments):
+    def __init__(self, parent_id, items, fetched):
+        children = [x.id for x in items if not isinstance(x, MoreComments)]
+        super().__init__(
+            None, {"count": len(children), "children": children, "parent_id": parent_id}
+        )
+        self.items = items
+        self.fetched = fetched
+
+    def comments(self, update=True):
+        self.fetched.append(self.parent_id)
+        return self.items
+
+
+class FakeCommentForest(list):
+    def replace_more(self, limit=None):
+        return []
+
+    def list(self):
+        return self
+
+
+class FakeSubmission:
+    def __init__(self, id, author, score, title, num_comments, created_utc, comments):
+        self.id = id
+        self.author = author
+        self.score = score
+        self.title = title
+        self.num_comments = num_comments
+        self.created_utc = created_utc
+        self.permalink = f"/r/test/comments/{id}/_/"
+        self.subreddit = "test"
+        self.fullname = f"t3_{id}"
+        self.hidden = False
+        self.is_robot_indexable = True
+        self.comments = FakeCommentForest(comments)
+
+
+class FakeSubreddit:
+    def __init__(self, submissions):
+        self.submissions = submissions
+        self.scanned = 0
+
+    def new(self, limit=100):
+        for submission in sorted(
+            self.submissions, key=lambda x: x.created_utc, reverse=True
+        )[:limit]:
+            self.scanned += 1
+            yield submission
+
+    def comments(self, limit=100):
+        comments = [x for s in self.submissions for x in s.comments]
+        for comment in sorted(comments, key=lambda x: x.created_utc, reverse=True)[
+            :limit
+        ]:
+            yield comment
+
+
+class FakeReddit:
+    def __init__(self, submissions):
+        self.submissions = {s.id: s for s in submissions}
+        self.subreddits = {}
+
+    def submission(self, id):
+        return self.submissions[id]
+
+    def info(self, fullnames):
+        things = {x.fullname: x for x in self.submissions.values()}
+        things.update(
+            {x.fullname: x for s in self.submissions.values() for x in s.comments}
+        )
+        for fullname in fullnames:
+            yield things[fullname]
+
+    def subreddit(self, name):
+        if name not in self.subreddits:
+            self.subreddits[name] = FakeSubreddit(list(self.submissions.values()))
+        return self.subreddits[name]
+
+
+@pytest.fixture
+def test_fake_reddit():
+    submissions = []
+    for i in range(20):
+        comments = [
+            FakeComment(
+                f"c{i}x{j}",
+                f"author{j % 3}",
+                j - 2,
+                f"body {i} {j}",
+                f"t3_p{i}" if j == 0 else f"t1_c{i}x{j - 1}",
+                1000 + i * 10 + j,
+                f"t3_p{i}",
+            )
+            for j in range(5)
+        ]
+        submissions.append(
+            FakeSubmission(
+                f"p{i}", f"author{i % 4}", i, f"title{i}", 5, 1000 + i * 10, comments
+            )
+        )
+    submissions[3].hidden = True
+    submissions[7].author = None
+    yield FakeReddit(submissions)
+
+
+@pytest.fixture
+def test_fake_tree():
+    """Comment tree of p0 with "load more comments" stubs.
+
+    The stubs are expanded in this order: under p0 (3 comments), under r0 (2
+    comments), under r1 (1 comment). Their parent_id is appended to fetched.
+    """
+
+    def comment(id, parent_id):
+        return FakeComment(id, "author", 1, f"body {id}", parent_id, 1000, "t3_p0")
+
+    fetched = []
+    r0 = comment("r0", "t3_p0")
+    r1 = comment("r1", "t3_p0")
+    r0.replies = [
+        comment("r0a", "t1_r0"),
+        FakeMoreComments(
+            "t1_r0", [comment("r0b", "t1_r0"), comment("r0c", "t1_r0")], fetched
+        ),
+    ]
+    p0_stub = FakeMoreComments(
+        "t3_p0",
+        [
+            r1,
+            comment("r2", "t3_p0"),
+            comment("r3", "t3_p0"),
+            FakeMoreComments("t1_r1", [comment("r1a", "t1_r1")], fetched),
+        ],
+        fetched,
+    )
+    submission = FakeSubmission(
+        "p0", "author", 1, "title", 9, 1000, [r0, p0_stub, comment("r4", "t3_p0")]
+    )
+    yield submission, fetched
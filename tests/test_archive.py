@@ -0,0 +1,195 @@
+import json
+import sys
+from datetime import datetime
+
+import pytest
+
+from reddit_bestof import __main__
+from reddit_bestof.archive import (
+    get_archive_data,
+    iter_archive_data,
+    open_archive,
+    read_archives,
+    split_archive_data,
+)
+from reddit_bestof.extract import get_data
+
+
+def get_records(reddit, subreddit: str = "test") -> tuple:
+    """Dumped submissions and comments of the fake reddit."""
+    submissions = []
+    comments = []
+    for submission in reddit.submissions.values():
+        submissions.append(
+            {
+                "id": submission.id,
+                "subreddit": subreddit,
+                "author": str(submission.author or "[deleted]"),
+                "score": submission.score,
+                "permalink": submission.permalink,
+                "title": submission.title,
+                "created_utc": submission.created_utc,
+                "num_comments": submission.num_comments,
+                "hidden": submission.hidden,
+                "is_robot_indexable": submission.is_robot_indexable,
+            }
+        )
+        for comment in submission.comments:
+            comments.append(
+                {
+                    "id": comment.id,
+                    "subreddit": subreddit,
+                    "link_id": comment.link_id,
+                    "author": comment.author,
+                    "score": comment.score,
+                    "body": comment.body,
+                    "parent_id": comment.parent_id,
+                    "permalink": comment.permalink,
+                    "created_utc": str(comment.created_utc),
+                }
+            )
+    return submissions, comments
+
+
+def write_dump(path, records: list) -> str:
+    path.write_text("".join(json.dumps(x) + "\n" for x in records))
+    return str(path)
+
+
+@pytest.fixture
+def test_dumps(test_fake_reddit, tmp_path):
+    submissions, comments = get_records(test_fake_reddit)
+    other_submissions, other_comments = get_records(test_fake_reddit, "other")
+    yield [
+        write_dump(tmp_path / "RS_1.ndjson", other_submissions[:5] + submissions[:10]),
+        write_dump(tmp_path / "RS_2.ndjson", submissions[10:]),
+        write_dump(tmp_path / "RC_1.ndjson", comments[::2] + other_comments),
+        write_dump(tmp_path / "RC_2.ndjson", comments[1::2]),
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_get_archive_data(test_fake_reddit, test_dumps, workers):
+    post_ids = [f"p{i}" for i in reversed(range(20))]
+    expected_posts, expected_comments = get_data(test_fake_reddit, post_ids)
+    posts, comments = get_archive_data(test_dumps, "Test", 0, 2000, workers)
+
+    assert posts == expected_posts
+    assert sorted(comments, key=lambda x: x["id"]) == sorted(
+        expected_comments, key=lambda x: x["id"]
+    )
+    assert [x["id"] for x in comments[:5]] == [f"c19x{j}" for j in range(5)]
+
+
+def test_get_archive_data_window(test_dumps):
+    posts, comments = get_archive_data(test_dumps, "test", 1050, 1100)
+
+    assert [x["id"] for x in posts] == ["p10", "p9", "p8", "p6", "p5"]
+    assert [x["id"] for x in comments if x["id"].startswith("c10")] == ["c10x0"]
+    assert {x["timestamp"] for x in comments if x["id"].startswith("c9")} == {1090}
+
+
+def test_split_archive_data(test_dumps):
+    data = read_archives(test_dumps, ["Test", "other"], 1000, 2000)
+    windows = [(1000, 1050), (1050, 1100), (1100, 2000)]
+
+    assert split_archive_data(data["test"], windows) == [
+        list(iter_archive_data(test_dumps, "test", *x)) for x in windows
+    ]
+    assert split_archive_data(data["other"], [(0, 1100)]) == [
+        list(iter_archive_data(test_dumps, "other", 0, 1100))
+    ]
+
+
+def test_get_archive_comment_permalink(tmp_path):
+    record = {
+        "id": "c0",
+        "subreddit": "test",
+        "link_id": "t3_p0",
+        "author": "author",
+        "score": 1,
+        "body": "body",
+        "parent_id": "t3_p0",
+        "created_utc": 1000,
+    }
+    dumps = [
+        write_dump(tmp_path / "RC.ndjson", [record]),
+        write_dump(
+            tmp_path / "RS.ndjson",
+            [
+                {
+                    "id": "p0",
+                    "subreddit": "test",
+                    "author": "author",
+                    "score": 1,
+                    "permalink": "/r/test/comments/p0/_/",
+                    "title": "title",
+                    "created_utc": 1000,
+                    "num_comments": 1,
+                }
+            ],
+        ),
+    ]
+    _, comments = get_archive_data(dumps, "test", 0, 2000)
+
+    assert comments[0]["permalink"] == (
+        "https://reddit.com/r/test/comments/p0/_/c0/?context=2"
+    )
+
+
+def test_open_zst_archive(tmp_path):
+    zstandard = pytest.importorskip("zstandard")
+    lines = "".join(json.dumps({"id": i}) + "\n" for i in range(1000))
+    path = tmp_path / "RC.zst"
+    path.write_bytes(zstandard.ZstdCompressor().compress(lines.encode()))
+    with open_archive(str(path)) as f:
+        assert f.read() == lines
+
+
+def test_backfill_archive_chunks(test_fake_reddit, tmp_path, monkeypatch):
+    start = int(datetime(2021, 11, 1, 12).timestamp())
+    for i, submission in enumerate(test_fake_reddit.submissions.values()):
+        submission.created_utc = start + (i % 3) * 86400 + i
+        for comment in submission.comments:
+            comment.created_utc = submission.created_utc + 5
+    submissions, comments = get_records(test_fake_reddit)
+    dumps = [
+        write_dump(tmp_path / "RS.ndjson", submissions),
+        write_dump(tmp_path / "RC.ndjson", comments),
+    ]
+    template = tmp_path / "post.txt"
+    template.write_text("${best_post_title} ${best_comment_id} $number_total_comments")
+    # No request is sent, the stats only use the archives
+    monkeypatch.setattr(__main__, "get_reddit", lambda *args: test_fake_reddit)
+    exports = []
+    for chunk_days in [1, 2, 7]:
+        folder = tmp_path / str(chunk_days)
+        folder.mkdir()
+        monkeypatch.chdir(folder)
+        monkeypatch.setattr(
+            sys,
+            "argv",
+            [
+                "reddit_bestof",
+                "-s",
+                "test",
+                "-f",
+                str(template),
+                "--no_posting",
+                "--archive",
+                *dumps,
+                "--backfill",
+                "2021-11-01",
+            ],
+        )
+        args = __main__.parse_args()
+        assert __main__.backfill(args, [args], "2021-11-03", chunk_days) == []
+        exports.append(
+            {
+                x.name.rsplit("_", 1)[0]: x.read_text()
+                for x in (folder / "Exports").iterdir()
+            }
+        )
+
+    assert len(exports[0]) == 3
+    assert exports[0] == exports[1] == exports[2]
@@ -0,0 +1,77 @@
+import prawcore
+
+from reddit_bestof import collector
+from reddit_bestof.extract import get_data
+from reddit_bestof.store import Store
+
+
+def test_collect(test_fake_reddit, tmp_path):
+    with Store(tmp_path / "bestof.db") as store:
+        assert collector.collect(test_fake_reddit, store, "test", 1000, 1150) == (
+            14,
+            66,
+        )
+        # a second poll only reads what is newer than the high-water marks
+        assert collector.poll_submissions(test_fake_reddit, store, "test", 0, 1150) == 0
+
+        test_fake_reddit.submissions["p0"].comments[0].score = 100
+        collector.refresh(test_fake_reddit, store, "test", 1000, 1150)
+        posts, comments = store.load_data("test", 1000, 1150)
+
+    tree_posts, tree_comments = get_data(test_fake_reddit, [f"p{i}" for i in range(16)])
+    assert sorted(posts, key=lambda x: x["id"]) == sorted(
+        tree_posts, key=lambda x: x["id"]
+    )
+    # comments posted after the end of the window are not collected
+    tree_comments = [
+        x for x in tree_comments if x["id"] not in ["c15x1", "c15x2", "c15x3", "c15x4"]
+    ]
+    assert sorted(comments, key=lambda x: x["id"]) == sorted(
+        tree_comments, key=lambda x: x["id"]
+    )
+
+
+def test_collect_next_window(test_fake_reddit, tmp_path):
+    with Store(tmp_path / "bestof.db") as store:
+        collector.collect(test_fake_reddit, store, "test", 1000, 1150)
+        # p16 to p19 were created after the first window
+        assert collector.collect(test_fake_reddit, store, "test", 1150, 1300) == (
+            4,
+            24,
+        )
+        posts, comments = store.load_data("test", 1150, 1300)
+
+    # p15 was created at the end of the first window, which is also the start of this one
+    assert sorted(x["id"] for x in posts) == ["p15", "p16", "p17", "p18", "p19"]
+    assert len(comments) == 25
+
+
+class FakeClock:
+    def __init__(self, now: int):
+        self.now = now
+
+    def time(self) -> int:
+        return self.now
+
+    def sleep(self, seconds: int):
+        self.now += seconds
+
+
+def test_collect_poll_error(test_fake_reddit, tmp_path, monkeypatch):
+    poll_submissions = collector.poll_submissions
+    polls = []
+
+    def failing_poll_submissions(*args):
+        polls.append(collector.time.time())
+        if len(polls) == 1:
+            raise prawcore.RequestException(ConnectionError(), (), {})
+        return poll_submissions(*args)
+
+    monkeypatch.setattr(collector, "time", FakeClock(1000))
+    monkeypatch.setattr(collector, "poll_submissions", failing_poll_submissions)
+    with Store(tmp_path / "bestof.db") as store:
+        assert collector.collect(
+            test_fake_reddit, store, "test", 1000, 1150, poll_interval=100
+        ) == (14, 66)
+
+    assert polls == [1000, 1100, 1150]
@@ -0,0 +1,53 @@
+from reddit_bestof.expand import ExpansionBudget, expand_comments
+from reddit_bestof.extract import get_submission_data
+
+
+def test_expand_comments(test_fake_tree):
+    submission, fetched = test_fake_tree
+    budget = ExpansionBudget()
+    comments = expand_comments(submission, budget)
+
+    assert [x.id for x in comments] == [
+        "r0",
+        "r4",
+        "r1",
+        "r2",
+        "r3",
+        "r0a",
+        "r0b",
+        "r0c",
+        "r1a",
+    ]
+    # biggest stubs first
+    assert fetched == ["t3_p0", "t1_r0", "t1_r1"]
+    assert budget.recovered == [3, 2, 1]
+    assert budget.skipped_stubs == 0
+
+
+def test_expand_comments_per_submission(test_fake_tree):
+    submission, fetched = test_fake_tree
+    budget = ExpansionBudget(per_submission=1)
+    comments = expand_comments(submission, budget)
+
+    assert [x.id for x in comments] == ["r0", "r4", "r1", "r2", "r3", "r0a"]
+    assert fetched == ["t3_p0"]
+    assert (budget.skipped_stubs, budget.skipped_comments) == (2, 3)
+
+
+def test_expand_comments_budget(test_fake_tree):
+    submission, fetched = test_fake_tree
+    budget = ExpansionBudget(requests=2)
+    post, comments = get_submission_data(None, submission, budget=budget)
+
+    assert len(comments) == 8
+    assert fetched == ["t3_p0", "t1_r0"]
+    assert budget.remaining == 0
+    assert budget.summary().startswith("2 MoreComments requests recovered 5 comments")
+
+
+def test_expand_comments_workers(test_fake_tree):
+    submission, fetched = test_fake_tree
+    comments = expand_comments(submission, ExpansionBudget(workers=2))
+
+    assert len(comments) == 9
+    assert sorted(fetched) == ["t1_r0", "t1_r1", "t3_p0"]
@@ -0,0 +1,105 @@
+import logging
+
+from conftest import FakeReddit, FakeSubmission
+
+from reddit_bestof.extract import (
+    get_data,
+    get_listing_data,
+    get_reddit_submissions,
+    refresh_scores,
+)
+
+
+def test_get_data(test_fake_reddit):
+    post_ids = [f"p{i}" for i in range(20)]
+    posts, comments = get_data(test_fake_reddit, post_ids)
+
+    assert len(posts) == 18
+    assert len(comments) == 90
+    assert "p3" not in [x["id"] for x in posts]
+    assert "p7" not in [x["id"] for x in posts]
+    assert comments[0] == {
+        "id": "c0x0",
+        "score": -2,
+        "author": "/u/author0",
+        "permalink": "https://reddit.com/r/test/comments/t3_p0/_/c0x0/?context=2",
+        "body": "body 0 0",
+        "parent": "t3_p0",
+        "length": 8,
+        "timestamp": 1000,
+    }
+
+
+def test_get_data_workers(test_fake_reddit):
+    post_ids = [f"p{i}" for i in range(20)]
+
+    assert get_data(test_fake_reddit, post_ids, workers=4) == get_data(
+        test_fake_reddit, post_ids
+    )
+
+
+def test_get_reddit_submissions(test_fake_reddit):
+    submissions = get_reddit_submissions(test_fake_reddit, "test", 1050, 1150, False)
+
+    assert [x.id for x in submissions] == [f"p{i}" for i in range(15, 4, -1)]
+    # p4 is the first post older than the window: the scan stops there
+    assert test_fake_reddit.subreddit("test").scanned == 16
+
+
+def test_get_reddit_submissions_rate_change():
+    # the newest 100 posts span 20 hours, 300 posts were created in the 4 hours before
+    timestamps = [100000 - i * 720 for i in range(100)]
+    timestamps += [timestamps[-1] - (i + 1) * 48 for i in range(300)]
+    reddit = FakeReddit(
+        [
+            FakeSubmission(f"p{i}", "author", 1, "title", 0, x, [])
+            for i, x in enumerate(timestamps)
+        ]
+    )
+    submissions = get_reddit_submissions(reddit, "test", timestamps[-1], 100000, False)
+
+    assert len(submissions) == 400
+
+
+def test_get_reddit_submissions_pages_saved(test_fake_reddit, caplog):
+    with caplog.at_level(logging.DEBUG, logger="reddit_bestof.extract"):
+        get_reddit_submissions(test_fake_reddit, "test", 0, 100000, True)
+
+    # --test only asks for one page
+    assert "in 1 pages (0 pages saved)" in caplog.text
+
+
+def test_get_data_from_listing(test_fake_reddit):
+    submissions = get_reddit_submissions(test_fake_reddit, "test", 0, 2000, False)
+    post_ids = [x.id for x in submissions]
+
+    assert get_data(test_fake_reddit, submissions) == get_data(
+        test_fake_reddit, post_ids
+    )
+
+
+def test_get_listing_data(test_fake_reddit):
+    submissions = get_reddit_submissions(test_fake_reddit, "test", 0, 2000, False)
+    posts, comments = get_listing_data(test_fake_reddit, "test", submissions, 0, 2000)
+    tree_posts, tree_comments = get_data(test_fake_reddit, submissions)
+
+    assert posts == tree_posts
+    assert sorted((x["id"], x["parent"]) for x in comments) == sorted(
+        (x["id"], x["parent"]) for x in tree_comments
+    )
+
+    posts, comments = get_listing_data(
+        test_fake_reddit, "test", submissions, 1052, 1061
+    )
+    assert [x["id"] for x in comments] == ["c6x1", "c6x0", "c5x4", "c5x3", "c5x2"]
+
+
+def test_refresh_scores(test_fake_reddit):
+    posts, comments = get_data(test_fake_reddit, ["p0", "p1"])
+    test_fake_reddit.submissions["p0"].score = 50
+    test_fake_reddit.submissions["p0"].num_comments = 8
+    test_fake_reddit.submissions["p1"].comments[2].score = -30
+    refresh_scores(test_fake_reddit, posts, comments)
+
+    assert (posts[0]["score"], posts[0]["num_comments"]) == (50, 8)
+    assert [x["score"] for x in comments if x["id"] == "c1x2"] == [-30]
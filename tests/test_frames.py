@@ -0,0 +1,162 @@
+import pandas as pd
+import pytest
+
+from reddit_bestof import rollup, utils
+from reddit_bestof.__main__ import get_env_post
+from reddit_bestof.extract import (
+    get_data,
+    get_data_frames,
+    iter_submission_data,
+    refresh_frame_scores,
+)
+from reddit_bestof.frames import FramesBuilder, fetch_missing_bodies, get_frames
+from reddit_bestof.graph import get_reply_graph
+
+
+def test_get_frames(test_fake_reddit):
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    df_posts, df_comments = get_frames(posts, comments)
+
+    assert df_posts["score"].dtype == "int32"
+    assert df_posts["timestamp"].dtype == "int64"
+    assert df_comments["length"].dtype == "int32"
+    assert df_comments["author"].dtype == "category"
+    assert "permalink" not in df_comments
+    assert utils.get_permalinks(df_comments).tolist() == [
+        x["permalink"] for x in comments
+    ]
+    pd.testing.assert_frame_equal(
+        df_posts.astype({"author": str}), pd.DataFrame(posts), check_dtype=False
+    )
+
+
+def test_get_data_frames(test_fake_reddit):
+    post_ids = [f"p{i}" for i in range(20)]
+    df_posts, df_comments = get_data_frames(test_fake_reddit, post_ids, workers=4)
+    expected_posts, expected_comments = get_frames(
+        *get_data(test_fake_reddit, post_ids)
+    )
+
+    pd.testing.assert_frame_equal(df_posts, expected_posts)
+    pd.testing.assert_frame_equal(df_comments, expected_comments)
+
+
+def test_typed_frames_stats(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    df_posts, df_comments = get_frames(posts, comments)
+    env = get_env_post(None, df_posts, df_comments, "date", "test")
+    expected = get_env_post(
+        None, pd.DataFrame(posts), pd.DataFrame(comments), "date", "test"
+    )
+    pd.reset_option("display.max_colwidth")
+
+    assert env == expected
+    typed_rollup = rollup.get_rollup(df_posts, df_comments)
+    expected_rollup = rollup.get_rollup(pd.DataFrame(posts), pd.DataFrame(comments))
+    for name, table in expected_rollup.items():
+        pd.testing.assert_frame_equal(typed_rollup[name], table, check_dtype=False)
+
+
+def test_typed_author_stats_commenters(test_fake_reddit):
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    posts[0] = {**posts[0], "author": "/u/only_posts"}
+    df_posts, df_comments = get_frames(posts, comments)
+
+    # posters share the author categories of the comments
+    assert "/u/only_posts" in df_comments["author"].cat.categories
+    assert "/u/only_posts" not in utils.get_author_stats(df_comments).index
+    assert (utils.get_author_stats(df_comments)["comments"] > 0).all()
+
+
+def test_refresh_frame_scores(test_fake_reddit):
+    df_posts, df_comments = get_data_frames(test_fake_reddit, ["p0", "p1"])
+    test_fake_reddit.submissions["p0"].score = 50
+    test_fake_reddit.submissions["p0"].num_comments = 8
+    test_fake_reddit.submissions["p1"].comments[2].score = -30
+    df_posts, df_comments = refresh_frame_scores(
+        test_fake_reddit, df_posts, df_comments
+    )
+
+    assert df_posts.loc[0, ["score", "num_comments"]].tolist() == [50, 8]
+    assert df_comments.loc[df_comments["id"] == "c1x2", "score"].tolist() == [-30]
+    assert df_comments["score"].dtype == "int32"
+
+
+def get_lazy_frames(reddit, post_ids: list, top: int):
+    builder = FramesBuilder(keep_bodies=False, top=top)
+    for post, comments in iter_submission_data(reddit, post_ids):
+        builder.add_post(post)
+        builder.add_comments(comments)
+    return builder.get_frames()
+
+
+def test_lazy_bodies(test_fake_reddit):
+    for i, submission in enumerate(test_fake_reddit.submissions.values()):
+        for j, comment in enumerate(submission.comments):
+            comment.score = (i * 7 + j * 3) % 13 - 6
+            if j == 2:
+                comment.parent_id = submission.fullname
+    pd.options.display.max_colwidth = None
+    post_ids = [f"p{i}" for i in range(20)]
+    posts, comments = get_data(test_fake_reddit, post_ids)
+    df_posts, df_comments = get_lazy_frames(test_fake_reddit, post_ids, 3)
+    env = get_env_post(None, df_posts, df_comments, "date", "test")
+    expected = get_env_post(
+        None, pd.DataFrame(posts), pd.DataFrame(comments), "date", "test"
+    )
+    pd.reset_option("display.max_colwidth")
+
+    assert env == expected
+    assert df_comments["body"].isna().sum() > 20
+    typed_rollup = rollup.get_rollup(df_posts, df_comments, top=3)
+    expected_rollup = rollup.get_rollup(
+        pd.DataFrame(posts), pd.DataFrame(comments), top=3
+    )
+    for name, table in expected_rollup.items():
+        pd.testing.assert_frame_equal(typed_rollup[name], table, check_dtype=False)
+
+
+def test_lazy_bodies_candidates():
+    comments = [
+        {
+            "id": f"c{i}",
+            "score": i % 7,
+            "author": "/u/author",
+            "permalink": f"https://reddit.com/r/test/comments/p0/_/c{i}/?context=2",
+            "body": f"body {i}",
+            "parent": "t3_p0" if i % 10 == 0 else f"t1_c{i - i % 10}",
+            "length": 6,
+            "timestamp": 1000,
+        }
+        for i in range(50)
+    ]
+    builder = FramesBuilder(keep_bodies=False, top=2)
+    for i in range(0, 50, 10):
+        builder.add_comments(comments[i : i + 10])
+    _, df_comments = builder.get_frames()
+    bodies = df_comments.set_index("id")["body"].dropna()
+
+    # ties are broken by position: scores 6 and 0, then the first answers
+    assert {"c6", "c13", "c0", "c7", "c10"} <= set(bodies.index)
+    assert len(bodies) <= 3 * 2 * 2
+
+
+@pytest.mark.parametrize("with_graph", [False, True])
+def test_fetch_missing_bodies(test_fake_reddit, with_graph):
+    for submission in test_fake_reddit.submissions.values():
+        for comment in submission.comments:
+            comment.parent_id = submission.fullname
+    df_posts, df_comments = get_lazy_frames(test_fake_reddit, ["p0", "p1"], 1)
+    test_fake_reddit.submissions["p1"].comments[2].score = 100
+    df_posts, df_comments = refresh_frame_scores(
+        test_fake_reddit, df_posts, df_comments
+    )
+    assert df_comments.loc[df_comments["id"] == "c1x2", "body"].isna().all()
+    reply_graph = get_reply_graph(df_comments) if with_graph else None
+    df_comments = fetch_missing_bodies(
+        test_fake_reddit, df_comments, top=1, reply_graph=reply_graph
+    )
+
+    assert df_comments.loc[df_comments["id"] == "c1x2", "body"].tolist() == ["body 1 2"]
+    assert df_comments["body"].isna().sum() == 6
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from reddit_bestof import utils
+from reddit_bestof.graph import ReplyGraph
+
+
+def get_comments() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": ["a", "b", "c", "a", "d", "e", "f"],
+            "author": ["author1", "author2", "author1", "author3", "author2", "x", "y"],
+            "parent": ["t3_p", "t1_a", "t1_b", "t1_x", "t1_a", "t1_x", "t1_c"],
+        }
+    )
+
+
+def test_reply_graph():
+    graph = ReplyGraph(get_comments())
+
+    assert graph.ids.tolist() == ["a", "b", "c", "d", "e", "f", "x"]
+    assert graph.rows.tolist() == [0, 1, 2, 4, 5, 6, -1]
+    assert graph.parents.tolist() == [-1, 0, 1, 6, 0, 6, 2]
+    assert graph.get_node("x") == 6
+    assert graph.get_node("p") == -1
+    assert graph.get_children(graph.get_node("a")).tolist() == [1, 4]
+    assert graph.get_children(graph.get_node("x")).tolist() == [3, 5]
+    assert graph.get_children(graph.get_node("d")).tolist() == []
+    assert graph.answers.tolist() == [2, 1, 1, 0, 0, 0, 2]
+
+
+def test_reply_graph_queries():
+    df_comments = get_comments()
+    graph = ReplyGraph(df_comments)
+    # ties are broken by the first answer, like value_counts
+    answers = df_comments.loc[df_comments.parent.str.startswith("t1_"), "parent"]
+    expected = answers.value_counts().index.str.slice(3).tolist()
+
+    assert graph.ids[graph.get_most_answered(10)].tolist() == expected
+    assert graph.ids[graph.get_most_answered(1)].tolist() == ["a"]
+    replies, replied = graph.get_reply_pairs()
+    assert replies.tolist() == [2, 6]
+    assert replied.tolist() == [1, 2]
+    assert utils.get_interactions(df_comments, reply_graph=graph).to_dict("list") == {
+        "author1": ["author1", "author1"],
+        "author2": ["author2", "y"],
+        "score": [1, 1],
+    }
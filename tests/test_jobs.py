@@ -0,0 +1,67 @@
+import argparse
+import json
+
+import pytest
+
+from reddit_bestof.__main__ import get_backfill_reports, get_jobs, is_exported
+
+
+def get_args(**kwargs) -> argparse.Namespace:
+    args = {
+        "subreddit": None,
+        "post_subreddit": None,
+        "template_file": "templates/post.txt",
+        "template_file_title": None,
+        "template_file_message": None,
+        "no_posting": True,
+        "jobs": None,
+        "period": "day",
+    }
+    return argparse.Namespace(**{**args, **kwargs})
+
+
+def test_get_jobs(tmp_path):
+    args = get_args(subreddit="france")
+    assert get_jobs(args) == [args]
+    with pytest.raises(ValueError):
+        get_jobs(get_args())
+
+    jobs = tmp_path / "jobs.json"
+    jobs.write_text(
+        json.dumps(
+            [
+                {"subreddit": "france", "post_subreddit": "bestoffrance"},
+                {"subreddit": "rance", "template_file": "templates/rance.txt"},
+            ]
+        )
+    )
+    france, rance = get_jobs(get_args(jobs=str(jobs)))
+    assert (france.subreddit, france.post_subreddit) == ("france", "bestoffrance")
+    assert france.template_file == "templates/post.txt"
+    assert (rance.subreddit, rance.post_subreddit) == ("rance", None)
+    assert rance.template_file == "templates/rance.txt"
+    assert rance.no_posting
+
+    jobs.write_text(json.dumps([{"subreddit": "france", "test": True}]))
+    with pytest.raises(ValueError):
+        get_jobs(get_args(jobs=str(jobs)))
+
+
+def test_get_backfill_reports(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    france, rance = get_args(subreddit="france"), get_args(subreddit="rance")
+    days = ["2021-11-01", "2021-11-02"]
+    assert not is_exported(france, "2021-11-01")
+
+    (tmp_path / "Exports").mkdir()
+    (tmp_path / "Exports" / "2021-11-01_france_1635800000.txt").write_text("")
+    (tmp_path / "Exports" / "2021-11-02_france_week_1635800000.txt").write_text("")
+    (tmp_path / "Exports" / "2021-11-02_rance_1635800000.txt.tmp").write_text("")
+    assert is_exported(france, "2021-11-01")
+    assert not is_exported(france, "2021-11-02")
+    assert is_exported(get_args(subreddit="france", period="week"), "2021-11-02")
+    assert get_backfill_reports([france, rance], days) == [
+        (rance, "2021-11-01"),
+        (france, "2021-11-02"),
+        (rance, "2021-11-02"),
+    ]
@@ -0,0 +1,59 @@
+import json
+
+import pandas as pd
+
+from reddit_bestof.__main__ import get_env_post
+from reddit_bestof.extract import get_data
+from reddit_bestof.metrics import Metrics, save_metrics
+from reddit_bestof.requestor import RequestStats
+
+
+def test_metrics_stage():
+    stats = RequestStats()
+    metrics = Metrics(stats, "test")
+    with metrics.stage("listing"):
+        stats.add_request()
+        stats.add_request()
+        stats.add_retry()
+    with metrics.stage("listing"):
+        stats.add_request()
+    assert metrics.call(max, 1, 2) == 2
+
+    assert metrics.stages["listing"]["calls"] == 2
+    assert metrics.stages["listing"]["requests"] == 3
+    assert metrics.stages["listing"]["retries"] == 1
+    assert metrics.stages["max"]["requests"] == 0
+
+
+def test_get_env_post_metrics(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    metrics = Metrics()
+    env = get_env_post(
+        None, pd.DataFrame(posts), pd.DataFrame(comments), "date", "test", None, metrics
+    )
+    assert env == get_env_post(
+        None, pd.DataFrame(posts), pd.DataFrame(comments), "date", "test"
+    )
+    pd.reset_option("display.max_colwidth")
+    assert {"get_author_stats", "get_amoureux", "get_krach"} <= set(metrics.stages)
+
+
+def test_save_metrics(tmp_path):
+    stats = RequestStats()
+    metrics = Metrics(stats, "test")
+    with metrics.stage("listing"):
+        stats.add_request()
+
+    save_metrics(tmp_path / "metrics.prom", [metrics], stats, 1.5)
+    text = (tmp_path / "metrics.prom").read_text()
+    assert 'reddit_bestof_stage_requests{subreddit="test",stage="listing"} 1' in text
+    assert "reddit_bestof_run_seconds 1.5" in text
+
+    save_metrics(tmp_path / "metrics.json", [metrics], stats, 1.5)
+    with open(tmp_path / "metrics.json") as f:
+        content = json.load(f)
+    assert content["requests"] == 1
+    assert content["subreddits"]["test"]["listing"]["requests"] == 1
+    # no temporary file is left
+    assert len(list(tmp_path.iterdir())) == 2
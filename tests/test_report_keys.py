@@ -0,0 +1,100 @@
+import argparse
+
+import pandas as pd
+
+from reddit_bestof import rollup
+from reddit_bestof.__main__ import (
+    get_env_post,
+    get_report_keys,
+    get_template_keys,
+    send_report,
+)
+from reddit_bestof.extract import get_data
+from reddit_bestof.metrics import Metrics
+
+
+def test_get_template_keys(tmp_path):
+    template = tmp_path / "post.txt"
+    template.write_text("${best_post_title} par $poc_author, 10 $$ et $$amoureux")
+
+    assert get_template_keys(template) == {"best_post_title", "poc_author"}
+    args = argparse.Namespace(
+        template_file=template, no_posting=False, notify_winners=True
+    )
+    assert get_report_keys(args) == {
+        "best_post_title",
+        "poc_author",
+        "best_comment_body",
+        "best_comment_id",
+        "worst_comment_id",
+        "discussed_comment_id",
+    }
+
+
+def test_get_env_post_keys(test_fake_reddit):
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    df_posts, df_comments = pd.DataFrame(posts), pd.DataFrame(comments)
+    metrics = Metrics()
+    keys = {"best_post_title", "poc_author"}
+    env = get_env_post(None, df_posts, df_comments, "date", "test", None, metrics, keys)
+    full_env = get_env_post(None, df_posts, df_comments, "date", "test")
+
+    assert set(metrics.stages) == {"get_best_post", "get_author_stats", "get_poc"}
+    assert set(env) == {
+        "date",
+        "subreddit",
+        "number_total_posts",
+        "number_total_comments",
+        "number_unique_users",
+        *[x for x in full_env if x.startswith(("best_post_", "poc_"))],
+    }
+    assert env == {key: full_env[key] for key in env}
+
+
+def test_get_env_rollup_keys(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    day_rollup = rollup.get_rollup(pd.DataFrame(posts), pd.DataFrame(comments))
+    env = rollup.get_env_rollup(None, day_rollup, "date", "test", {"amoureux_score"})
+    full_env = rollup.get_env_rollup(None, day_rollup, "date", "test")
+    pd.reset_option("display.max_colwidth")
+
+    assert set(env) == {
+        "date",
+        "subreddit",
+        "number_total_posts",
+        "number_total_comments",
+        "number_unique_users",
+        "amoureux_author1",
+        "amoureux_author2",
+        "amoureux_score",
+    }
+    assert env == {key: full_env[key] for key in env}
+
+
+def test_send_report_no_posting(test_fake_reddit, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    template = tmp_path / "post.txt"
+    template.write_text("${best_post_title}")
+    args = argparse.Namespace(
+        template_file=template,
+        no_posting=True,
+        notify_winners=False,
+        subreddit="test",
+        period="day",
+    )
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    env = get_env_post(
+        None,
+        pd.DataFrame(posts),
+        pd.DataFrame(comments),
+        "date",
+        "test",
+        None,
+        Metrics(),
+        get_report_keys(args),
+    )
+    send_report(None, Metrics(), args, "2021-11-02", env)
+
+    (export,) = (tmp_path / "Exports").glob("2021-11-02_test_*.txt")
+    assert export.read_text() == env["best_post_title"]
@@ -0,0 +1,214 @@
+import json
+import sys
+from datetime import datetime
+
+import praw
+import pytest
+import requests
+
+from reddit_bestof import __main__
+from reddit_bestof.expand import ExpansionBudget
+from reddit_bestof.extract import get_data
+from reddit_bestof.requestor import (
+    BestofRequestor,
+    Cassette,
+    RateLimiter,
+    RequestStats,
+)
+
+
+def get_comment(id: str, parent_id: str) -> dict:
+    return {
+        "kind": "t1",
+        "data": {
+            "id": id,
+            "name": f"t1_{id}",
+            "parent_id": parent_id,
+            "link_id": "t3_p0",
+            "author": "author",
+            "score": 1,
+            "body": f"body {id}",
+            "permalink": f"/r/test/comments/p0/_/{id}/",
+            "created_utc": 1000,
+            "replies": "",
+        },
+    }
+
+
+def get_post() -> dict:
+    return {
+        "kind": "t3",
+        "data": {
+            "id": "p0",
+            "name": "t3_p0",
+            "author": "author",
+            "score": 10,
+            "title": "title",
+            "permalink": "/r/test/comments/p0/_/",
+            "created_utc": 1000,
+            "num_comments": 2,
+            "hidden": False,
+            "is_robot_indexable": True,
+            "subreddit": "test",
+        },
+    }
+
+
+RESPONSES = {
+    "https://www.reddit.com/api/v1/access_token": {
+        "access_token": "secret",
+        "expires_in": 86400,
+        "scope": "*",
+        "token_type": "bearer",
+    },
+    "https://oauth.reddit.com/comments/p0/": [
+        {
+            "kind": "Listing",
+            "data": {"children": [get_post()]},
+        },
+        {
+            "kind": "Listing",
+            "data": {
+                "children": [
+                    get_comment("c0", "t3_p0"),
+                    {
+                        "kind": "more",
+                        "data": {
+                            "count": 1,
+                            "children": ["c1"],
+                            "parent_id": "t3_p0",
+                            "id": "c1",
+                            "name": "t1_c1",
+                        },
+                    },
+                ]
+            },
+        },
+    ],
+    "https://oauth.reddit.com/r/test/new": {
+        "kind": "Listing",
+        "data": {"children": [get_post()], "after": None},
+    },
+    "https://oauth.reddit.com/api/morechildren/": {
+        "json": {"errors": [], "data": {"things": [get_comment("c1", "t3_p0")]}}
+    },
+}
+
+
+class FakeHTTP:
+    def __init__(self):
+        self.headers = {}
+        self.requests = 0
+
+    def request(self, method, url, **kwargs):
+        self.requests += 1
+        response = requests.Response()
+        response.status_code = 200
+        response.headers["content-type"] = "application/json"
+        response._content = json.dumps(RESPONSES[url]).encode("utf-8")
+        return response
+
+    def close(self):
+        pass
+
+
+class CountingRateLimiter(RateLimiter):
+    def __init__(self):
+        super().__init__(60000)
+        self.tokens = 0
+
+    def acquire(self) -> float:
+        self.tokens += 1
+        return super().acquire()
+
+
+def get_reddit(
+    cassette: Cassette,
+    http: FakeHTTP,
+    stats: RequestStats = None,
+    rate_limiter: RateLimiter = None,
+) -> praw.Reddit:
+    return praw.Reddit(
+        client_id="id",
+        client_secret="secret",
+        user_agent="python:test:reddit_bestof",
+        check_for_updates=False,
+        requestor_class=BestofRequestor,
+        requestor_kwargs={
+            "rate_limiter": rate_limiter or RateLimiter(60000),
+            "cassette": cassette,
+            "session": http,
+            "stats": stats,
+        },
+    )
+
+
+def test_record_replay(tmp_path):
+    path = tmp_path / "cassette.json.gz"
+    cassette = Cassette(path, record=True)
+    cassette.metadata["report_date"] = "2021-11-02"
+    http = FakeHTTP()
+    stats = RequestStats()
+    rate_limiter = CountingRateLimiter()
+    recorded = get_data(
+        get_reddit(cassette, http, stats, rate_limiter),
+        ["p0"],
+        budget=ExpansionBudget(),
+    )
+    cassette.save()
+    assert http.requests == 3
+    assert rate_limiter.tokens == 3
+    assert stats.requests == 3
+    assert stats.bytes > 0
+    assert len(recorded[1]) == 2
+
+    cassette = Cassette(path, latency=0)
+    assert cassette.metadata == {"report_date": "2021-11-02"}
+    assert all("secret" not in x["body"] for x in cassette.exchanges)
+    http = FakeHTTP()
+    rate_limiter = CountingRateLimiter()
+    reddit = get_reddit(cassette, http, rate_limiter=rate_limiter)
+    assert get_data(reddit, ["p0"], budget=ExpansionBudget()) == recorded
+    assert http.requests == 0
+    assert rate_limiter.tokens == 0
+
+    with pytest.raises(ValueError):
+        get_data(reddit, ["p1"])
+
+
+def test_main_record_replay(tmp_path, monkeypatch):
+    cassette_path = tmp_path / "cassette.json.gz"
+    template = tmp_path / "post.txt"
+    template.write_text("${best_post_title} ${best_comment_body} $poc_score")
+    # The window of the day ends at 23:00
+    day = datetime.fromtimestamp(1000 + 3600).strftime("%Y-%m-%d")
+    arguments = ["reddit_bestof", "-s", "test", "-f", str(template), "--no_posting"]
+    get_main_reddit = __main__.get_reddit
+
+    def get_recording_reddit(rate_limiter, stats, cassette=None):
+        if cassette and cassette.record:
+            return get_reddit(cassette, FakeHTTP(), stats, rate_limiter)
+        return get_main_reddit(rate_limiter, stats, cassette)
+
+    monkeypatch.setattr(__main__, "get_reddit", get_recording_reddit)
+    exports = []
+    for name, options in [
+        ("record", ["-d", day, "--record", str(cassette_path)]),
+        ("replay", ["--replay", str(cassette_path), "--replay_latency", "0"]),
+    ]:
+        folder = tmp_path / name
+        folder.mkdir()
+        monkeypatch.chdir(folder)
+        monkeypatch.setattr(sys, "argv", arguments + options)
+        __main__.main()
+        (export,) = (folder / "Exports").iterdir()
+        exports.append((export.name, export.read_text()))
+
+    assert exports[0][0].startswith(f"{day}_test_")
+    assert exports[0] == exports[1]
+    assert exports[0][1] == "title body c0 2"
+    monkeypatch.setattr(
+        sys, "argv", arguments + ["-d", day, "--replay", str(cassette_path)]
+    )
+    with pytest.raises(ValueError):
+        __main__.main()
@@ -0,0 +1,63 @@
+import pandas as pd
+import pytest
+
+from reddit_bestof import rollup
+from reddit_bestof.__main__ import get_env_post
+from reddit_bestof.extract import get_data
+
+
+@pytest.fixture
+def test_rollup_dataframes(test_fake_reddit):
+    # main() sets it so that get_discussed_comment doesn't truncate links
+    pd.options.display.max_colwidth = None
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    df_posts = pd.DataFrame(posts)
+    df_comments = pd.DataFrame(comments)
+    # c0x0 is the most discussed comment
+    replies = df_comments[df_comments["id"].str.startswith("c1x")].copy()
+    replies["id"] = replies["id"] + "_reply"
+    replies["parent"] = "t1_c0x0"
+    yield df_posts, pd.concat([df_comments, replies], ignore_index=True)
+    pd.reset_option("display.max_colwidth")
+
+
+def test_get_env_rollup(test_rollup_dataframes, tmp_path):
+    df_posts, df_comments = test_rollup_dataframes
+    rollup.save_rollup(
+        rollup.get_rollup(df_posts, df_comments), "test", "2021-11-02", tmp_path
+    )
+    day_rollup = rollup.load_rollup("test", "2021-11-02", tmp_path)
+
+    assert rollup.get_env_rollup(
+        None, rollup.merge_rollups([day_rollup]), "date", "test"
+    ) == get_env_post(None, df_posts, df_comments, "date", "test")
+    assert rollup.load_rollup("test", "2021-11-03", tmp_path) is None
+
+
+def test_merge_rollups(test_rollup_dataframes):
+    df_posts, df_comments = test_rollup_dataframes
+    rollups = [
+        rollup.get_rollup(
+            df_posts[(df_posts.timestamp >= start) & (df_posts.timestamp < end)],
+            df_comments[
+                (df_comments.timestamp >= start) & (df_comments.timestamp < end)
+            ],
+        )
+        for start, end in [(1000, 1050), (1050, 1100), (1100, 1200)]
+    ]
+
+    assert rollup.get_env_rollup(
+        None, rollup.merge_rollups(rollups), "date", "test"
+    ) == get_env_post(None, df_posts, df_comments, "date", "test")
+
+
+def test_rollup_comment_ties(test_rollup_dataframes):
+    df_posts, df_comments = test_rollup_dataframes
+    df_comments = df_comments.assign(score=df_comments.index % 2)
+    rollups = [
+        rollup.get_rollup(df_posts, df_comments.iloc[:10], top=3),
+        rollup.get_rollup(df_posts, df_comments.iloc[10:20], top=3),
+    ]
+    comments = rollup.merge_rollups(rollups, top=3)["comments"]
+
+    assert comments["id"].tolist() == df_comments["id"].iloc[:6].tolist()
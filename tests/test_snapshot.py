@@ -0,0 +1,31 @@
+import pandas as pd
+import pytest
+
+from reddit_bestof.extract import get_data
+
+pytest.importorskip("pyarrow")
+
+from reddit_bestof import snapshot  # noqa: E402
+
+
+def test_snapshot(test_fake_reddit, tmp_path):
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    df_posts = pd.DataFrame(posts)
+    df_comments = pd.DataFrame(comments)
+    snapshot.save_snapshot(df_posts, df_comments, "test", "2021-11-02", tmp_path)
+    snapshot.save_snapshot(
+        df_posts.head(2), df_comments.head(3), "test", "2021-11-03", tmp_path
+    )
+    # saving a day again replaces its snapshot
+    snapshot.save_snapshot(df_posts, df_comments, "test", "2021-11-02", tmp_path)
+
+    loaded = snapshot.load_snapshot("posts", "test", ["2021-11-02"], path=tmp_path)
+    assert loaded["id"].tolist() == df_posts["id"].tolist()
+    assert loaded["score"].tolist() == df_posts["score"].tolist()
+    assert loaded["author"].astype(object).tolist() == df_posts["author"].tolist()
+
+    loaded = snapshot.load_snapshot(
+        "comments", "test", columns=["id", "score"], path=tmp_path
+    )
+    assert list(loaded.columns) == ["id", "score"]
+    assert len(loaded) == len(df_comments) + 3
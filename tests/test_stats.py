@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+from reddit_bestof import rollup, stats
+from reddit_bestof.extract import get_data
+from reddit_bestof.metrics import Metrics
+
+
+@pytest.fixture
+def test_stats_inputs(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    posts, comments = get_data(test_fake_reddit, [f"p{i}" for i in range(20)])
+    yield {
+        "reddit": None,
+        "df_posts": pd.DataFrame(posts),
+        "df_comments": pd.DataFrame(comments),
+    }
+    pd.reset_option("display.max_colwidth")
+
+
+def test_compute_stats(test_stats_inputs):
+    metrics = Metrics()
+    env = stats.compute_stats(
+        stats.STATS, stats.INPUTS, test_stats_inputs, metrics=metrics, workers=4
+    )
+
+    assert env == stats.compute_stats(stats.STATS, stats.INPUTS, test_stats_inputs)
+    assert list(env) == [key for stat in stats.STATS for key in stat.keys]
+    # Shared inputs are only computed once
+    assert metrics.stages["get_author_stats"]["calls"] == 1
+    assert metrics.stages["get_reply_graph"]["calls"] == 1
+
+
+def test_compute_stats_keys(test_stats_inputs):
+    metrics = Metrics()
+    env = stats.compute_stats(
+        stats.STATS,
+        stats.INPUTS,
+        test_stats_inputs,
+        {"amoureux_score"},
+        metrics,
+    )
+
+    assert list(env) == stats.AMOUREUX_KEYS
+    assert set(metrics.stages) == {"get_reply_graph", "get_amoureux"}
+    with pytest.raises(ValueError):
+        stats.compute_stats(stats.STATS, stats.INPUTS, {}, {"best_post_id"})
+
+
+def test_rollup_stats(test_stats_inputs):
+    day_rollup = rollup.get_rollup(
+        test_stats_inputs["df_posts"], test_stats_inputs["df_comments"]
+    )
+    env = stats.compute_stats(
+        rollup.ROLLUP_STATS,
+        rollup.ROLLUP_INPUTS,
+        {"reddit": None, "df_comments": None, **day_rollup},
+        workers=4,
+    )
+
+    assert env == stats.compute_stats(stats.STATS, stats.INPUTS, test_stats_inputs)
@@ -0,0 +1,48 @@
+from reddit_bestof.extract import get_data
+from reddit_bestof.store import Store
+
+
+def test_store_load_data(tmp_path):
+    post = {
+        "id": "p1",
+        "score": 10,
+        "author": "/u/author1",
+        "permalink": "permalink1",
+        "title": "title1",
+        "timestamp": 1000,
+        "num_comments": 2,
+    }
+    comments = [
+        {
+            "id": f"c{i}",
+            "score": i,
+            "author": "/u/author2",
+            "permalink": f"permalink{i}",
+            "body": f"body{i}",
+            "parent": "t3_p1",
+            "length": 5,
+            "timestamp": 1000,
+        }
+        for i in range(2)
+    ]
+    with Store(tmp_path / "bestof.db") as store:
+        store.save_submission("test", post, comments)
+
+        assert store.load_data("test", 0, 2000) == ([post], comments)
+        assert store.load_data("test", 2000, 3000) == ([], [])
+        assert store.load_data("other", 0, 2000) == ([], [])
+
+
+def test_get_data_store(test_fake_reddit, tmp_path):
+    post_ids = [f"p{i}" for i in range(20)]
+    with Store(tmp_path / "bestof.db") as store:
+        posts, comments = get_data(test_fake_reddit, post_ids, store=store)
+
+        # unchanged posts are read from the store
+        test_fake_reddit.submissions["p0"].comments[0].score = 100
+        assert get_data(test_fake_reddit, post_ids, store=store) == (posts, comments)
+
+        # posts with new comments are fetched again
+        test_fake_reddit.submissions["p0"].num_comments = 6
+        posts, comments = get_data(test_fake_reddit, post_ids, store=store)
+        assert comments[0]["score"] == 100
@@ -0,0 +1,64 @@
+import pandas as pd
+
+from reddit_bestof import rollup
+from reddit_bestof.__main__ import get_env_post
+from reddit_bestof.extract import add_submission_data, get_data, iter_submission_data
+from reddit_bestof.streaming import StreamingStats
+
+
+def get_streaming_reddit(test_fake_reddit):
+    """Fake posts with ties, replies of replies and a most discussed comment."""
+    for i, submission in enumerate(test_fake_reddit.submissions.values()):
+        for j, comment in enumerate(submission.comments):
+            comment.score = (i * 7 + j * 3) % 13 - 6
+            comment.body = f"body {i} {j}" + " QUOI ?" * (j % 2)
+            if j == 2:
+                comment.parent_id = submission.fullname
+            if i == 1 and j > 0:
+                comment.parent_id = "t1_c1x0"
+    return test_fake_reddit
+
+
+def test_streaming_stats(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    reddit = get_streaming_reddit(test_fake_reddit)
+    post_ids = [f"p{i}" for i in range(20)]
+    posts, comments = get_data(reddit, post_ids)
+    df_posts, df_comments = pd.DataFrame(posts), pd.DataFrame(comments)
+    stats = StreamingStats(top=3)
+    add_submission_data(stats, reddit, post_ids)
+    env = stats.get_env_post(None, "date", "test")
+    expected = get_env_post(None, df_posts, df_comments, "date", "test")
+    pd.reset_option("display.max_colwidth")
+
+    assert env == expected
+    expected_rollup = rollup.get_rollup(df_posts, df_comments, top=3)
+    for name, table in stats.get_rollup().items():
+        # the index isn't saved with the rollups
+        pd.testing.assert_frame_equal(
+            table, expected_rollup[name].reset_index(drop=True), check_dtype=False
+        )
+
+
+def test_streaming_stats_partial(test_fake_reddit):
+    pd.options.display.max_colwidth = None
+    reddit = get_streaming_reddit(test_fake_reddit)
+    stats = StreamingStats()
+    posts = []
+    comments = []
+    for post, post_comments in iter_submission_data(
+        reddit, [f"p{i}" for i in range(20)]
+    ):
+        stats.add_post(post)
+        stats.add_comments(post_comments)
+        posts.append(post)
+        comments.extend(post_comments)
+        if len(posts) == 8:
+            break
+    env = stats.get_env_post(None, "date", "test")
+    expected = get_env_post(
+        None, pd.DataFrame(posts), pd.DataFrame(comments), "date", "test"
+    )
+    pd.reset_option("display.max_colwidth")
+
+    assert env == expected
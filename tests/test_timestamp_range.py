@@ -1,6 +1,8 @@
 from datetime import datetime
 
-from reddit_bestof.date_utils import get_timestamp_range
+import pytest
+
+from reddit_bestof.date_utils import get_days, get_period_range, get_timestamp_range
 
 
 def test_day_timestamp():
@@ -19,3 +21,35 @@ def test_day_end_of_month_timestamp():
         int(datetime(2021, 2, 1, 23, 00).timestamp()),
     )
     assert get_timestamp_range("2021-02-01") == result
+
+
+def test_month_period_range():
+    result = (
+        "du mois de novembre 2021",
+        ["2021-11-01", "2021-11-02"],
+    )
+    assert get_period_range("2021-11-02", "month") == result
+
+
+def test_week_period_range():
+    formatted_date, days = get_period_range("2021-03-02", "week")
+    assert days == [
+        "2021-02-24",
+        "2021-02-25",
+        "2021-02-26",
+        "2021-02-27",
+        "2021-02-28",
+        "2021-03-01",
+        "2021-03-02",
+    ]
+
+
+def test_get_days():
+    assert get_days("2021-02-27", "2021-03-01") == [
+        "2021-02-27",
+        "2021-02-28",
+        "2021-03-01",
+    ]
+    assert get_days("2021-03-01", "2021-03-01") == ["2021-03-01"]
+    with pytest.raises(ValueError):
+        get_days("2021-03-02", "2021-03-01")
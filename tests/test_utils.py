@@ -1,3 +1,5 @@
+import pandas as pd
+
 from reddit_bestof import utils
 
 
@@ -180,3 +182,67 @@ def test_get_krach(test_score_comments_dataframe):
     print(utils.get_krach(test_score_comments_dataframe))
 
     assert utils.get_krach(test_score_comments_dataframe) == expected_result
+
+
+def test_get_poc_tie():
+    df_comments = pd.DataFrame(
+        {
+            "author": ["/u/zed", "/u/amy", "/u/zed", "/u/amy", "/u/bob"],
+            "score": [1, 1, 1, 1, 1],
+            "body": ["a", "b", "c", "d", "e"],
+        }
+    )
+
+    assert utils.get_poc(df_comments) == {"poc_author": "/u/amy", "poc_score": 2}
+
+
+def test_get_author_stats(test_capslock_comments_dataframe):
+    author_stats = utils.get_author_stats(test_capslock_comments_dataframe)
+
+    assert list(author_stats.columns) == [
+        "score",
+        "length",
+        "comments",
+        "capslock",
+        "question",
+    ]
+    assert author_stats.loc["author1"].to_dict() == {
+        "score": 13,
+        "length": 98,
+        "comments": 4,
+        "capslock": 44,
+        "question": 0,
+    }
+    assert "body2" not in test_capslock_comments_dataframe
+
+
+def test_count_questions():
+    body = pd.Series(["Quoi ?", "_?", "Pas de question", "A ? B ?? _ ? C", "?!?"])
+
+    assert utils.count_questions(body).tolist() == [1, 0, 0, 2, 0]
+
+
+def test_count_questions_accented_words():
+    body = pd.Series(["À ?", "é ? ü ? ç", "ß ?!"], dtype=str)
+
+    assert utils.count_questions(body).tolist() == [1, 2, 1]
+
+
+def test_get_indecision_does_not_mutate(test_indecision_comments_dataframe):
+    columns = list(test_indecision_comments_dataframe.columns)
+    utils.get_indecision(test_indecision_comments_dataframe)
+    utils.get_capslock(test_indecision_comments_dataframe)
+
+    assert list(test_indecision_comments_dataframe.columns) == columns
+
+
+def test_get_interactions(test_amoureux_comments_dataframe):
+    data = test_amoureux_comments_dataframe.copy()
+    # self-replies are not counted
+    data.loc[len(data)] = ["author3", 1, "body9", "permalink9", "id9", "t1_id7"]
+
+    assert utils.get_interactions(data, top=2).to_dict("list") == {
+        "author1": ["author1", "author2"],
+        "author2": ["author2", "author3"],
+        "score": [4, 3],
+    }